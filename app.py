@@ -2,7 +2,14 @@
 # 先出“所选月份”的总结性解读 → 再按目标推荐产品+理由
 # 新增：综合运势打分（/100）与“三条提升建议”
 import streamlit as st
-import csv, json, datetime, pathlib
+import json, datetime
+
+from fortune import metrics
+from fortune.catalog import load_styles
+from fortune.memo import cached_reading
+from fortune.query import QueryIndex
+from fortune.render import AppMarkdown
+from fortune.sessions import default_store
 
 # ========= 文案（中/英） =========
 MSG = {
@@ -23,6 +30,8 @@ MSG = {
         "target": "Which year-month to read? (YYYY-MM, e.g., 2025-09)",
         "goal": "What do you want to boost?",
         "goal_opts": ["career","wealth","health","emotion","love","study","social"],
+        "budget": "Budget per set (£, 0 = any)",
+        "vibes": "Preferred vibe (optional)",
         "summary_title": "Monthly Summary",
         "summary_hint": "This summary reflects the energy of your selected month.",
         "score": "Overall score",
@@ -54,6 +63,8 @@ MSG = {
         "target": "想查看哪一年哪一月？(YYYY-MM，例如 2025-09)",
         "goal": "希望提升哪个方向？",
         "goal_opts": ["career","wealth","health","emotion","love","study","social"],
+        "budget": "每套预算（£，0 = 不限）",
+        "vibes": "偏好氛围（可选）",
         "summary_title": "当月综合解读",
         "summary_hint": "此处仅反映你所选月份的能量概况。",
         "score": "综合评分",
@@ -70,101 +81,136 @@ MSG = {
     }
 }
 
-# ========= 极简规则（可替换为八字/梅花专业算法） =========
-MONTH_TO_ELEMENT = {
-    "1":"earth","2":"wood","3":"wood","4":"earth","5":"fire","6":"fire",
-    "7":"earth","8":"metal","9":"metal","10":"earth","11":"water","12":"water"
-}
-GOAL_BIAS = {
-    "career": ["fire","metal"],
-    "wealth": ["metal","earth"],
-    "health": ["water","wood"],
-    "emotion": ["water","earth"],
-    "love":   ["wood","water"],
-    "study":  ["wood","fire"],
-    "social": ["earth","metal"],
-}
-MEIHUA_LASTDIGIT_TO_ELEMENT = {0:"water",1:"metal",2:"metal",3:"fire",4:"wood",5:"wood",6:"water",7:"earth",8:"earth",9:"metal"}
-
-def month_element(ym: str) -> str:
-    try:
-        token = ym.strip()
-        m = int(token.split("-")[-1]) if "-" in token else int(token)
-        return MONTH_TO_ELEMENT.get(str(m), "earth")
-    except Exception:
-        return "earth"
-
-def favored_elements(goal: str, month_elem: str, extra: str=None):
-    base = GOAL_BIAS.get(goal, ["fire","metal"])
-    seq = []
-    seen=set()
-    for e in (base + [month_elem] if not extra else [extra] + base + [month_elem]):
-        if e and e not in seen:
-            seen.add(e); seq.append(e)
-    return seq or ["earth"]
-
-def meihua_elem_from_nums(nums):
-    try:
-        if not nums: return None
-        last = int(str(nums[-1])[-1])
-        return MEIHUA_LASTDIGIT_TO_ELEMENT.get(last, "earth")
-    except Exception:
-        return None
-
-def load_styles(path="data/styles.csv"):
-    rows=[]
-    with open(path,"r",encoding="utf-8") as f:
-        for r in csv.DictReader(f):
-            rows.append({k: ("" if r[k] is None else str(r[k])) for k in r})
-    return rows
-
-def pick_styles(favored, styles, k=3):
-    bag=[s for s in styles if (s.get("element") or "") in favored]
-    if len(bag)<k:
-        for s in styles:
-            if s not in bag: bag.append(s)
-    return bag[:k]
-
-# ====== 新增：评分与建议 ======
-def compute_score(goal, month_elem_str, extra_elem, picks, favored):
-    """
-    简单可解释的打分：
-    - 基准 60
-    - 月元素命中目标偏好 +10
-    - 梅花元素命中目标偏好 +10
-    - 推荐产品中，元素落在 favored 的占比（最多 +20）
-    - 封顶/保底：[30,100]
-    """
-    score = 60
-    if month_elem_str in favored: score += 10
-    if extra_elem and (extra_elem in favored): score += 10
-    if picks:
-        hit = sum(1 for p in picks if (p.get("element") or "") in favored)
-        score += int(20 * (hit / max(1,len(picks))))
-    score = max(30, min(100, score))
-    return score
-
-def make_suggestions(lang, goal, month_elem_str, favored):
-    """
-    生成三条可执行建议：1条“月份元素型”，1条“目标领域型”，1条“习惯执行型”
-    文案足够短，方便放在卡片里。
-    """
-    # 元素 → 行动语义（非常简化，可自行调整）
-    elem_tips_en = {
-        "wood":  "Set one growth target; ship small daily progress.",
-        "fire":  "Increase visibility: share a weekly highlight.",
-        "earth": "Stabilize routines; batch tasks every morning.",
-        "metal": "Declutter and set sharp priorities; say no twice.",
-        "water": "Protect recovery windows; hydrate and walk 20 min.",
-    }
-    elem_tips_cn = {
-        "wood":  "设一个成长目标；每天小步前进并记录。",
-        "fire":  "提高曝光度：每周公开一次成果。",
-        "earth": "稳住作息；每天上午批量处理琐事。",
-        "metal": "做减法与聚焦；本周学会拒绝两次。",
-        "water": "保护修复窗口；多喝水并坚持 20 分钟步行。",
+# ========= 规则 / 评分 / 建议 / 选款：见 fortune/ =========
+# load_styles 为进程级缓存（跨会话、跨重跑共享，文件变化才重新解析）；
+# cached_reading（fortune/memo.py）一次给出月份元素 / 评分 / 建议 / 选款，
+# constraints 为 vibes / tones / min_price / max_price。
+_MD = AppMarkdown(MSG)
+
+def render_markdown(lang, name, ym, month_elem_str, goal, favored, extra_elem, score, tips, picks):
+    # 模板按语言预编译、款式行按 (语言, SKU) 缓存（fortune/render.py）
+    return _MD.render(lang, name, ym, month_elem_str, goal, favored, extra_elem, score, tips, picks)
+
+# ========= 页面（一步一步问答） =========
+st.set_page_config(page_title="MITAY", page_icon="💅")
+ss = st.session_state
+ss.setdefault("step", 0)
+ss.setdefault("lang", "en")
+
+lang = st.sidebar.radio(MSG["en"]["lang"] + " / " + MSG["cn"]["lang"], ["en","cn"],
+                        index=0 if ss.lang=="en" else 1)
+ss.lang = lang
+T = MSG[lang]
+
+st.title(T["title"])
+
+def nav(back=True, label=None):
+    c1, c2 = st.columns(2)
+    if back and c1.button(T["back"]):
+        ss.step -= 1; st.rerun()
+    if c2.button(label or T["next"]):
+        ss.step += 1; st.rerun()
+
+if ss.step == 0:
+    st.write(T["intro"])
+    nav(back=False, label=T["start"])
+elif ss.step == 1:
+    ss.name = st.text_input(T["name"], value=ss.get("name",""))
+    nav()
+elif ss.step == 2:
+    opts = T["method_opts"]
+    ss.method = st.radio(T["method"], [0,1], format_func=lambda i: opts[i], index=ss.get("method",0))
+    if ss.method == 0:
+        ss.dob = st.text_input(T["dob"], value=ss.get("dob",""))
+        ss.btime = st.text_input(T["time"], value=ss.get("btime",""))
+    else:
+        ss.nums_raw = st.text_input(T["nums"], value=ss.get("nums_raw",""))
+    nav()
+elif ss.step == 3:
+    ss.ym = st.text_input(T["target"], value=ss.get("ym","2025-09"))
+    goals = T["goal_opts"]
+    ss.goal = st.selectbox(T["goal"], goals, index=goals.index(ss.get("goal","career")))
+    ss.budget = st.number_input(T["budget"], min_value=0.0, step=1.0, value=float(ss.get("budget",0.0)))
+    tags = QueryIndex.of(load_styles("data/styles.csv")).tags()
+    ss.vibes = st.multiselect(T["vibes"], tags, default=[v for v in ss.get("vibes",[]) if v in tags])
+    nav(label=T["finish"])
+else:
+    name = (ss.get("name") or "").strip() or "friend"
+    ym = (ss.get("ym") or "").strip() or "2025-09"
+    goal = ss.get("goal","career")
+    nums = []
+    if ss.get("method") == 1:
+        raw = (ss.get("nums_raw") or "").replace("，",",")
+        nums = [x.strip() for x in raw.split(",") if x.strip()]
+
+    constraints = {"vibes": ss.get("vibes") or None, "max_price": ss.get("budget") or None}
+
+    styles = load_styles("data/styles.csv")
+    # 结果缓存：键为归一化输入 + 语言 + 目录版本；未命中时查预编译答案表，
+    # 有个性化条件再重算选款与评分。目录文件一变，缓存自动作废。
+    with metrics.timed("reading"):
+        r = cached_reading(styles, ym, goal, nums, lang, constraints)
+    month_elem_str, extra_elem, score = r.month_elem, r.extra_elem, r.score
+    favored, picks, tips = list(r.favored), list(r.picks), list(r.tips)
+
+    st.subheader(T["summary_title"])
+    st.caption(T["summary_hint"])
+    st.markdown(T["month_energy"].format(ym=ym, elem=month_elem_str))
+    st.markdown(T["goal_energy"].format(goal=goal, fav=", ".join(favored)))
+    if extra_elem:
+        st.markdown(T["meihua_energy"].format(extra=extra_elem))
+    st.metric(T["score"], f"{score}/100")
+    st.caption(T["score_hint"])
+
+    st.subheader(T["suggestions"])
+    for i,t in enumerate(tips,1):
+        st.markdown(f"{i}. {t}")
+
+    st.subheader(T["picks_title"])
+    for s in picks:
+        price = f" · £{s['price']}" if s.get("price") else ""
+        st.markdown(f"**{s.get('name','')}**{price}  \n{s.get('copy','')}  \n"
+                    f"_{T['reason']}: {s.get('element','')} ∈ {', '.join(favored)}_")
+
+    out = {
+        "name": name,
+        "method": "birthdate" if ss.get("method",0)==0 else "meihua",
+        "dob": ss.get("dob"), "birth_time": ss.get("btime") or None, "nums": nums,
+        "target_month": ym,
+        "goal": goal,
+        "constraints": {k: v for k, v in constraints.items() if v is not None},
+        "month_element": month_elem_str,
+        "meihua_element": extra_elem,
+        "elements_considered": favored,
+        "score": score,
+        "suggestions": tips,
+        "picks": [dict(p) for p in picks],
+        "generated_at": datetime.datetime.utcnow().isoformat()+"Z",
     }
-    goal_tips_en = {
-        "career":"Book a feedback chat; keep a weekly demo log.",
-        "wealth":"Audit expenses; raise price or add upsell.",
-        "health":"Schedule 3 workouts; track sleep 7 nights.",
+    with metrics.timed("render"):
+        md = render_markdown(lang, name, ym, month_elem_str, goal, favored, extra_elem, score, tips, picks)
+
+    # 每个不同的解读只存一次（重跑不重复写）；下载内容从会话存储读回
+    store = default_store()
+    sig = json.dumps([lang, {k: v for k, v in out.items() if k != "generated_at"}],
+                     ensure_ascii=False, sort_keys=True)
+    if ss.get("session_sig") != sig:
+        with metrics.timed("save"):
+            ss.session_id = store.append(out, md=md)
+        ss.session_sig = sig
+        metrics.count("fortune_readings_total", entry="app")
+    rec = store.get(ss.session_id)
+    c1, c2 = st.columns(2)
+    c1.download_button(T["download_md"], rec["md"], file_name=f"mitay_{rec['id']}.md", mime="text/markdown")
+    c2.download_button(T["download_json"], json.dumps(rec["data"], ensure_ascii=False, indent=2),
+                       file_name=f"mitay_{rec['id']}.json", mime="application/json")
+    if st.button(T["back"]):
+        ss.step = 3; st.rerun()
+    st.caption(T["footer"])
+
+# FORTUNE_METRICS=1 streamlit run app.py：侧栏查看 / 下载本进程的分阶段耗时与计数
+if metrics.ENABLED:
+    with st.sidebar.expander("metrics"):
+        prom = metrics.render_prometheus()
+        st.code(prom, language="text")
+        st.download_button("metrics.prom", prom, file_name="metrics.prom", mime="text/plain")
@@ -0,0 +1,213 @@
+# bench/bench_pipeline.py —— 解读管线分阶段基准：目录规模 6 … 1M 行
+# 用法：python bench/bench_pipeline.py [--sizes 6,1000,100000,1000000] [--out 结果.json]
+#                                      [--compare 旧结果.json] [--no-memory]
+# 每个规模生成一份合成 styles.csv（元素分布偏斜，少量行无价格/无元素），依次计时：
+#   load_csv / build_snapshot / load_snapshot / load_cached → load_styles
+#   resolve（month_element + 梅花 + favored_elements）→ pick_styles（含预算条件）
+#   → compute_score → make_suggestions → render_md（quiz_cli）/ render_markdown（run_demo；
+#   app.py 导入即运行 Streamlit 页面，不在这里计时）
+# 以及端到端每秒解读数、12 个月年度展望（run_demo.make_outlook）一次的耗时；tracemalloc 另跑一遍记录峰值内存（不与计时混在一起）。
+# 结果写成 JSON，--compare 与另一次提交的结果逐项对比。
+import argparse, csv, datetime, json, pathlib, platform, random, subprocess, sys
+import tempfile, time, tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from fortune.catalog import CatalogCache, StyleCatalog
+from fortune.outlook import month_range
+from fortune.query import pick_styles
+from fortune.rules import (
+    GOALS, compute_score, favored_elements, make_suggestions, meihua_elem_from_nums, month_element,
+)
+from fortune.snapshot import build_snapshot, load_snapshot
+from quiz_cli import render_md
+from run_demo import make_outlook, make_reading, render_markdown
+
+FIELDS = ["sku", "name", "element", "tone", "vibe", "copy", "price"]
+ELEMENTS = ["earth", "fire", "wood", "metal", "water"]
+ELEMENT_WEIGHTS = [50, 25, 13, 8, 4]        # 偏斜：稀有元素的 favored 命中要往后找
+VIBES = ["Focus", "Calm", "Radiant", "Social", "Bold", "Heal"]
+TONES = ["cool", "rosy", "gold", "graphite", "nude", "espresso", "berry"]
+DEFAULT_SIZES = "6,1000,10000,100000,1000000"
+
+
+def write_catalog(path, n, seed=7):
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(FIELDS)
+        for i in range(n):
+            r = rnd.random()
+            w.writerow([
+                f"SKU-{i:07d}", f"Style {i}",
+                "" if r < 0.005 else rnd.choices(ELEMENTS, ELEMENT_WEIGHTS)[0],
+                rnd.choice(TONES), "|".join(rnd.sample(VIBES, 2)), f"灵感文案 {i}",
+                "" if r > 0.99 else f"{rnd.randint(6, 30)}.{rnd.choice(['99', '50', '00'])}",
+            ])
+
+
+def make_cases(n, seed=11):
+    """随机请求：(ym, goal, nums, lang, budget)，四分之一带预算。"""
+    rnd = random.Random(seed)
+    return [(f"{rnd.randint(2024, 2027)}-{rnd.randint(1, 12):02d}", rnd.choice(GOALS),
+             [rnd.randint(0, 99) for _ in range(3)] if rnd.random() < 0.5 else [],
+             rnd.choice(["en", "cn"]), 15.0 if i % 4 == 0 else None)
+            for i in range(n)]
+
+
+def best_rate(fn, args, repeat=3, min_time=0.2):
+    """fn(*a) 逐个跑完 args 为一轮，至少跑 min_time 秒；取 repeat 次里最快的 µs/次。"""
+    best = None
+    for _ in range(repeat):
+        ops, t0 = 0, time.perf_counter()
+        while True:
+            for a in args:
+                fn(*a)
+            ops += len(args)
+            dt = time.perf_counter() - t0
+            if dt >= min_time:
+                break
+        us = dt / ops * 1e6
+        best = us if best is None else min(best, us)
+    return best
+
+
+def once(fn, *a):
+    t0 = time.perf_counter()
+    out = fn(*a)
+    return out, (time.perf_counter() - t0) * 1e6
+
+
+def peak_bytes(fn, *a):
+    tracemalloc.start()
+    try:
+        out = fn(*a)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return out, peak, current
+
+
+def reading(styles, ym, goal, nums, lang, budget):
+    """端到端一条解读（与 quiz_cli 相同的管线 + app 的评分与建议）。"""
+    month_elem = month_element(ym)
+    extra = meihua_elem_from_nums(nums)
+    favored = favored_elements(goal, month_elem, extra)
+    picks = pick_styles(favored, styles, 3, max_price=budget)
+    score = compute_score(goal, month_elem, extra, picks, favored)
+    tips = make_suggestions(lang, goal, month_elem, favored)
+    return score, tips, render_md(lang, "bench", ym, month_elem, goal, favored, picks)
+
+
+def bench_size(n, tmp, n_cases, memory):
+    csv_path = tmp / f"styles-{n}.csv"
+    write_catalog(csv_path, n)
+    res = {"rows": n, "csv_bytes": csv_path.stat().st_size, "stages_us": {}}
+    st = res["stages_us"]
+
+    cat, st["load_csv"] = once(StyleCatalog.from_csv, csv_path)
+    snap, st["build_snapshot"] = once(build_snapshot, csv_path)
+    _, st["load_snapshot"] = once(load_snapshot, snap, csv_path)
+    cache = CatalogCache()
+    cache.get(csv_path)
+    st["load_cached"] = best_rate(cache.get, [(csv_path,)])
+
+    cases = make_cases(n_cases)
+    res_args = [(ym, goal, nums) for ym, goal, nums, _, _ in cases]
+
+    def resolve(ym, goal, nums):
+        m = month_element(ym)
+        e = meihua_elem_from_nums(nums)
+        return m, e, favored_elements(goal, m, e)
+
+    mid = [resolve(*a) for a in res_args]
+    st["resolve"] = best_rate(resolve, res_args)
+    st["pick_styles"] = best_rate(lambda f: pick_styles(f, cat, 3), [(f,) for _, _, f in mid])
+    budget_args = [(f, c[4] or 20.0) for (_, _, f), c in zip(mid, cases)]
+    st["pick_styles_budget"] = best_rate(lambda f, b: pick_styles(f, cat, 3, max_price=b), budget_args)
+    picks = [pick_styles(f, cat, 3) for _, _, f in mid]
+    st["compute_score"] = best_rate(
+        compute_score, [(c[1], m, e, p, f) for c, (m, e, f), p in zip(cases, mid, picks)])
+    st["make_suggestions"] = best_rate(
+        make_suggestions, [(c[3], c[1], m, f) for c, (m, _, f) in zip(cases, mid)])
+    st["render_md"] = best_rate(
+        render_md, [(c[3], "bench", c[0], m, c[1], f, p) for c, (m, _, f), p in zip(cases, mid, picks)])
+    notes = ["Month leans **metal**.", "Focus **wealth**, prioritize: metal, earth."]
+    st["render_markdown"] = best_rate(
+        render_markdown, [(c[3], "bench", c[0], notes, p) for c, p in zip(cases, picks)])
+
+    e2e = best_rate(lambda *a: reading(cat, *a), cases)
+    demo = best_rate(lambda ym, goal, lang: make_reading("bench", ym, goal, lang, cat),
+                     [(c[0], c[1], c[3]) for c in cases])
+    outlook = best_rate(lambda ym, goal, lang: make_outlook("bench", month_range(ym, 12), goal, lang, cat),
+                        [(c[0], c[1], c[3]) for c in cases])
+    res["end_to_end"] = {"reading_us": e2e, "readings_per_sec": 1e6 / e2e,
+                         "run_demo_us": demo, "run_demo_per_sec": 1e6 / demo,
+                         "outlook_12mo_us": outlook, "outlook_vs_12_run_demo": 12 * demo / outlook}
+
+    if memory:
+        _, peak, kept = peak_bytes(StyleCatalog.from_csv, csv_path)
+        _, snap_peak, _ = peak_bytes(load_snapshot, snap, csv_path)
+        _, e2e_peak, _ = peak_bytes(lambda: [reading(cat, *c) for c in cases])
+        res["memory_bytes"] = {"load_csv_peak": peak, "catalog_retained": kept,
+                               "load_snapshot_peak": snap_peak, "readings_peak": e2e_peak}
+    return res
+
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    """逐规模、逐阶段打印 新/旧 耗时比（>1 为变慢）。"""
+    before = {r["rows"]: r for r in old["results"]}
+    print(f"\ncompare {old.get('commit')} → {new.get('commit')}  (new/old time; >1 is slower)")
+    for r in new["results"]:
+        o = before.get(r["rows"])
+        if o is None:
+            continue
+        pairs = [(k, o["stages_us"].get(k), v) for k, v in r["stages_us"].items()]
+        pairs.append(("end_to_end", o["end_to_end"]["reading_us"], r["end_to_end"]["reading_us"]))
+        cells = [f"{k}={v / ov:.2f}x" for k, ov, v in pairs if ov]
+        print(f"  rows={r['rows']:>9,}  " + "  ".join(cells))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help="逗号分隔的目录行数")
+    ap.add_argument("--cases", type=int, default=500, help="每个阶段轮换使用的随机请求数")
+    ap.add_argument("--out", default=None, help="结果 JSON（默认 outputs/bench/pipeline-<commit>.json）")
+    ap.add_argument("--compare", default=None, help="与之前的结果 JSON 对比")
+    ap.add_argument("--no-memory", action="store_true", help="跳过 tracemalloc 峰值内存测量")
+    args = ap.parse_args()
+
+    rev = git_rev()
+    report = {"commit": rev, "created_at": datetime.datetime.utcnow().isoformat() + "Z",
+              "python": platform.python_version(), "platform": platform.platform(),
+              "cases": args.cases, "results": []}
+    with tempfile.TemporaryDirectory() as d:
+        for n in (int(x) for x in args.sizes.split(",") if x.strip()):
+            r = bench_size(n, pathlib.Path(d), args.cases, not args.no_memory)
+            report["results"].append(r)
+            st, e2e = r["stages_us"], r["end_to_end"]
+            print(f"rows={n:>9,}  load_csv {st['load_csv'] / 1e3:9.1f} ms  "
+                  f"load_snapshot {st['load_snapshot'] / 1e3:7.1f} ms  "
+                  f"pick {st['pick_styles']:6.1f} µs  pick+budget {st['pick_styles_budget']:7.1f} µs  "
+                  f"render_md {st['render_md']:5.1f} µs  → {e2e['readings_per_sec']:9,.0f} readings/s"
+                  + (f"  peak {r['memory_bytes']['load_csv_peak'] / 2**20:7.1f} MiB"
+                     if "memory_bytes" in r else ""))
+
+    out = pathlib.Path(args.out or ROOT / "outputs" / "bench" / f"pipeline-{rev or 'local'}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"✅ {out}")
+    if args.compare:
+        compare(json.loads(pathlib.Path(args.compare).read_text(encoding="utf-8")), report)
+
+
+if __name__ == "__main__":
+    main()
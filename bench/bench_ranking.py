@@ -0,0 +1,76 @@
+# bench/bench_ranking.py —— rank_styles（打分 top-k）对比旧版 pick_styles 线性扫描
+# 用法：python bench/bench_ranking.py [--rows 100000] [--reps 2000]
+import argparse, pathlib, random, sys, time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from fortune.catalog import StyleCatalog
+from fortune.ranking import rank_styles
+from fortune.rules import GOAL_BIAS, MONTH_TO_ELEMENT, favored_elements
+
+ELEMENTS = ["wood", "fire", "earth", "metal", "water"]
+VIBES = ["Focus", "Calm", "Radiant", "Social", "Bold", "Heal"]
+
+
+def legacy_pick_styles(favored, styles, k=3):
+    """基线版本的 pick_styles，原样保留用于对比。"""
+    bag=[s for s in styles if (s.get("element") or "") in favored]
+    if len(bag)<k:
+        for s in styles:
+            if s not in bag: bag.append(s)
+    return bag[:k]
+
+
+def synth_rows(n, seed=7):
+    rnd = random.Random(seed)
+    for i in range(n):
+        yield {
+            "sku": f"SKU-{i:07d}", "name": f"Style {i}",
+            "element": rnd.choices(ELEMENTS, weights=[5, 3, 8, 2, 1])[0],
+            "tone": rnd.choice(["cool", "rosy", "gold", "graphite"]),
+            "vibe": "|".join(rnd.sample(VIBES, 2)),
+            "copy": f"copy {i}", "price": f"{rnd.randint(6, 30)}.99",
+        }
+
+
+def timeit(fn, cases, reps):
+    t0 = time.perf_counter()
+    for j in range(reps):
+        fn(*cases[j % len(cases)])
+    return (time.perf_counter() - t0) / reps * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--reps", type=int, default=2000)
+    args = ap.parse_args()
+
+    rows = list(synth_rows(args.rows))
+    cat = StyleCatalog(rows)
+    rank_styles(["fire"], cat, 3)           # 预热：分组索引每个目录只建一次
+    cases = [(favored_elements(g, MONTH_TO_ELEMENT[str(m)]), g)
+             for g in GOAL_BIAS for m in range(1, 13)]
+    legacy_reps = max(1, args.reps // 200)
+
+    res = [
+        ("legacy pick_styles (list of dicts)",
+         timeit(lambda f, g: legacy_pick_styles(f, rows, 3), cases, legacy_reps)),
+        ("StyleCatalog.pick (first-k)",
+         timeit(lambda f, g: cat.pick(f, 3), cases, args.reps)),
+        ("rank_styles (goal)",
+         timeit(lambda f, g: rank_styles(f, cat, 3, goal=g), cases, args.reps)),
+        ("rank_styles (goal + budget 15)",
+         timeit(lambda f, g: rank_styles(f, cat, 3, goal=g, budget=15), cases, args.reps)),
+        # 预算低于所有价格（£6.99 起）：预算内一段为空，不能逐请求扫描整组
+        ("rank_styles (goal + budget 1)",
+         timeit(lambda f, g: rank_styles(f, cat, 3, goal=g, budget=1), cases, args.reps)),
+        ("rank_styles (goal + budget 7)",
+         timeit(lambda f, g: rank_styles(f, cat, 3, goal=g, budget=7), cases, args.reps)),
+    ]
+    print(f"rows={args.rows:,}")
+    for label, us in res:
+        print(f"  {label:<36} {us:>12,.1f} µs/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# bench/importtime_budget.py —— CLI 入口的启动开销预算（python -X importtime）
+# 用法：python bench/importtime_budget.py [--runs 5] [--budget-ms 30]
+# 每个入口跑 N 次取最小的累计导入耗时；超预算或拉进了重依赖时退出码为 1。
+import argparse, pathlib, subprocess, sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+ENTRIES = ("quiz_cli", "run_demo")
+# CLI 路径上不该出现的重依赖：只在真正用到时才导入
+FORBIDDEN = ("streamlit", "numpy", "pandas", "multiprocessing", "asyncio", "secrets")
+
+
+def measure(module):
+    """一次 `import module` 的 (累计微秒, 该导入拉进的模块名集合)。"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr}")
+    tree = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == "imported package" or not cumulative.strip().isdigit():
+            continue                                # 表头
+        if not name.startswith("  "):               # 顶层导入：子模块先于它打印
+            if name.strip() == module:
+                return int(cumulative), {n.strip() for n in tree}
+            tree = []
+            continue
+        tree.append(name)
+    raise SystemExit(f"no importtime line for {module}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=30.0)
+    args = ap.parse_args()
+
+    failed = False
+    for module in ENTRIES:
+        runs = [measure(module) for _ in range(args.runs)]
+        best = min(us for us, _ in runs) / 1000
+        heavy = sorted({m for _, mods in runs for m in mods if m.split(".")[0] in FORBIDDEN})
+        ok = best <= args.budget_ms and not heavy
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<10} {best:6.1f} ms (budget {args.budget_ms:g} ms)"
+              + (f"  heavy imports: {', '.join(heavy)}" if heavy else ""))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
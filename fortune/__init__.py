@@ -0,0 +1,28 @@
+# fortune —— 三个入口（app.py / quiz_cli.py / run_demo.py）共用的核心模块
+# 子模块按需导入（PEP 562）：`import fortune` 本身不加载目录、进程池或 numpy。
+import importlib
+
+_EXPORTS = {
+    "StyleCatalog": "catalog", "CatalogCache": "catalog", "load_catalog": "catalog",
+    "load_styles": "catalog", "catalog_cache_stats": "catalog",
+    "MONTH_TO_ELEMENT": "rules", "GOAL_BIAS": "rules", "GOALS": "rules",
+    "MEIHUA_LASTDIGIT_TO_ELEMENT": "rules",
+    "month_element": "rules", "favored_elements": "rules", "meihua_elem_from_nums": "rules",
+    "compute_score": "rules", "make_suggestions": "rules",
+    "pick_styles": "query",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    mod = _EXPORTS.get(name)
+    if mod is None:
+        raise AttributeError(f"module 'fortune' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{mod}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
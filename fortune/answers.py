@@ -0,0 +1,84 @@
+# fortune/answers.py —— 全输入空间的预编译答案表
+# 规则只允许 12 个月 × 7 个目标 × 11 种梅花尾数（含“无梅花”），
+# 所以 favored / picks / score / 建议键 可以在目录加载后一次算完，
+# 之后每次解读只是一次字典查询。
+import weakref
+from collections import namedtuple
+
+from .catalog import StyleCatalog
+from .rules import (
+    GOAL_BIAS, MEIHUA_LASTDIGIT_TO_ELEMENT, MONTH_TO_ELEMENT,
+    compute_score, favored_elements, meihua_digit, parse_month, suggestion_keys,
+)
+
+MONTHS = tuple(range(0, 13))            # 0 = 无法解析/越界（按规则退化为 earth）
+DIGITS = (None,) + tuple(range(10))     # None = 未使用梅花
+
+Answer = namedtuple("Answer", "month_elem extra_elem favored picks score tip_keys")
+
+
+def normalize_month(ym):
+    """与 rules.month_element 同样的解析，返回 1..12；无法解析或越界返回 0。"""
+    m = parse_month(ym)
+    return m if m is not None and 1 <= m <= 12 else 0
+
+
+def normalize_digit(nums):
+    """与 rules.meihua_elem_from_nums 同样的解析，返回末位数字或 None。"""
+    return meihua_digit(nums)
+
+
+def compute_answer(month, goal, digit, styles, k=3):
+    """不查表、直接按规则计算一条答案（建表与未命中时共用）。"""
+    month_elem = MONTH_TO_ELEMENT.get(str(month), "earth")
+    extra = None if digit is None else MEIHUA_LASTDIGIT_TO_ELEMENT.get(digit, "earth")
+    favored = favored_elements(goal, month_elem, extra)
+    picks = StyleCatalog.of(styles).pick(favored, k)
+    score = compute_score(goal, month_elem, extra, picks, favored)
+    return Answer(month_elem, extra, tuple(favored), tuple(picks), score,
+                  suggestion_keys(goal, month_elem, favored))
+
+
+class AnswerTable:
+    """绑定到某一个目录对象的答案表；目录换了就要换表（见 answer_table）。"""
+
+    def __init__(self, catalog, k=3):
+        self.catalog = catalog
+        self.k = k
+        self.table = {
+            (m, g, d): compute_answer(m, g, d, catalog, k)
+            for m in MONTHS for g in GOAL_BIAS for d in DIGITS
+        }
+
+    def get(self, month, goal, digit):
+        hit = self.table.get((month, goal, digit))
+        if hit is None:                 # 未知目标：按默认偏好现算
+            _STATS["misses"] += 1
+            return compute_answer(month, goal, digit, self.catalog, self.k)
+        _STATS["hits"] += 1
+        return hit
+
+
+# 答案表挂在目录对象上（与 _query_index / _rank_groups 相同）：表里的 picks 引用着目录，
+# 放进以目录为键的全局字典会让旧目录永远回收不掉；挂在目录上，目录被替换后表随之回收。
+_LIVE = weakref.WeakSet()               # 仍存活的答案表，只用于统计
+_STATS = {"hits": 0, "misses": 0, "builds": 0}
+
+
+def answer_table(catalog, k=3):
+    table = catalog.__dict__.get("_answer_table")
+    if table is None or table.k != k:
+        table = catalog._answer_table = AnswerTable(catalog, k)
+        _LIVE.add(table)
+        _STATS["builds"] += 1
+    return table
+
+
+def answer_table_stats():
+    """进程内累计：hits（查表命中）、misses（表外现算）、builds（建表次数）；tables 为仍存活的表数。"""
+    return dict(_STATS, tables=len(_LIVE))
+
+
+def lookup_answer(catalog, ym, goal, nums=None, k=3):
+    """一次解读 = 归一化输入 + 一次字典查询。"""
+    return answer_table(catalog, k).get(normalize_month(ym), goal, normalize_digit(nums))
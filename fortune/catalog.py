@@ -0,0 +1,391 @@
+# fortune/catalog.py —— 款式目录：加载时一次性建立“元素 → 行号”索引
+# pick() 的结果与旧版 pick_styles 的线性扫描逐条一致，但只走 O(k)。
+import csv
+import heapq
+import os
+import re
+import threading
+from array import array
+from collections.abc import Mapping
+from itertools import count, islice
+
+from . import metrics
+
+# 低基数列：按词表编码为小整数，字符串全目录只存一份
+CODED_COLUMNS = ("element", "tone", "vibe")
+
+_PRICE_RE = re.compile(r"(0|[1-9][0-9]*)(?:\.([0-9]{1,2}))?")
+_PRICE_EMPTY, _PRICE_RAW = -2, -1       # decimals 的特殊值：空串 / 无法解析（原文另存）
+_VERSIONS = count(1)                    # StyleCatalog.version 的来源
+_MAX_SHORT_CODE = 0xFFFF                # array('H') 能放下的最大编号
+
+
+def copy_array(a, typecode):
+    """array / mmap memoryview → 独立可写的 array（整块拷贝，不逐个元素转换）。"""
+    out = array(typecode)
+    out.frombytes(memoryview(a).cast("B"))
+    return out
+
+
+class CodedColumn:
+    """
+    字符串 → 词表编号（array('H')；快照加载时为 mmap 上的 memoryview）。
+    词表超过 65536 项时编号列整体放宽为 array('I')（vibe / tone 这类高基数列）。
+    """
+
+    def __init__(self, vocab=None, codes=None):
+        self.vocab = list(vocab or [])
+        self.codes = array("H") if codes is None else codes
+        self._lookup = {v: i for i, v in enumerate(self.vocab)}
+
+    @property
+    def typecode(self):
+        return memoryview(self.codes).format
+
+    def code_of(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.vocab)
+            self.vocab.append(value)
+            if code > _MAX_SHORT_CODE and self.typecode == "H":
+                self.codes = array("I", self.codes)
+        return code
+
+    def append(self, value):
+        code = self.code_of(value)          # 可能放宽 self.codes，先取编号再写入
+        self.codes.append(code)
+
+    def set(self, i, value):
+        code = self.code_of(value)
+        self.codes[i] = code
+
+    def copy(self):
+        return CodedColumn(self.vocab, copy_array(self.codes, self.typecode))
+
+    def __getitem__(self, i):
+        return self.vocab[self.codes[i]]
+
+
+class PriceColumn:
+    """
+    价格按“分”存成 array('q')，小数位数另存（array('b')），渲染时原样还原文本：
+    "12.99" → 1299 / 2 位，"13" → 1300 / 0 位。无法解析的原文放进 raw。
+    """
+
+    def __init__(self, cents=None, decimals=None, raw=None):
+        self.cents = array("q") if cents is None else cents
+        self.decimals = array("b") if decimals is None else decimals
+        self.raw = dict(raw or {})
+
+    @staticmethod
+    def _parse(text):
+        m = _PRICE_RE.fullmatch(text)
+        if m:
+            frac = m.group(2) or ""
+            return int(m.group(1)) * 100 + int(frac.ljust(2, "0") or 0), len(frac)
+        return -1, (_PRICE_RAW if text else _PRICE_EMPTY)
+
+    def append(self, text):
+        cents, decimals = self._parse(text)
+        if decimals == _PRICE_RAW:
+            self.raw[len(self.cents)] = text
+        self.cents.append(cents)
+        self.decimals.append(decimals)
+
+    def set(self, i, text):
+        cents, decimals = self._parse(text)
+        self.raw.pop(i, None)
+        if decimals == _PRICE_RAW:
+            self.raw[i] = text
+        self.cents[i] = cents
+        self.decimals[i] = decimals
+
+    def copy(self):
+        return PriceColumn(copy_array(self.cents, "q"), copy_array(self.decimals, "b"), self.raw)
+
+    def value(self, i):
+        """数值价格（英镑）；没有价格时返回 None。"""
+        return None if self.decimals[i] < 0 else self.cents[i] / 100
+
+    def __getitem__(self, i):
+        d = self.decimals[i]
+        if d < 0:
+            return self.raw.get(i, "")
+        c = self.cents[i]
+        whole = str(c // 100)
+        return whole if d == 0 else whole + "." + f"{c % 100:02d}"[:d]
+
+
+class PackedStrings:
+    """只读字符串列：UTF-8 字节块 + 偏移表（快照 mmap 用），按需解码。"""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class StyleRow(Mapping):
+    """目录里一行的轻量视图：只存 (目录, 行号)，按列名取值。用法与原来的 dict 一样。"""
+
+    __slots__ = ("_cat", "_i")
+
+    def __init__(self, cat, i):
+        self._cat = cat
+        self._i = i
+
+    def __getitem__(self, key):
+        col = self._cat.columns.get(key)
+        if col is None:
+            raise KeyError(key)
+        return col[self._i]
+
+    def __iter__(self):
+        return iter(self._cat.fields)
+
+    def __len__(self):
+        return len(self._cat.fields)
+
+    def __repr__(self):
+        return f"StyleRow({dict(self)!r})"
+
+
+def csv_rows(f):
+    """(列名, 各行字符串元组的迭代器)；与 DictReader 一致：缺列补 ""，多余的列丢弃。"""
+    reader = csv.reader(f)
+    fields = next(reader, [])
+    width = len(fields)
+    return fields, (tuple(r) if len(r) == width else tuple((r + [""] * width)[:width])
+                    for r in reader if r)
+
+
+class StyleCatalog:
+    """
+    只读的列式款式目录。
+    - fields / columns：CSV 列名与对应的列存储（element/tone/vibe 编码、price 定点整数、其余为字符串列表）
+    - by_element：元素 → 行号 array（升序）
+    - _fallback：按 CSV 顺序、按内容去重后的行号（旧版补位时 `s not in bag` 的等价物）
+    通过下标 / 迭代得到的是 StyleRow 视图，按需创建。
+    """
+
+    def __init__(self, rows, fields=None):
+        """rows：dict 的可迭代对象（列名取自 fields 或第一行）。"""
+        rows = iter(rows)
+        if fields is None:
+            first = next(rows, None)
+            fields = list(first) if first is not None else []
+            if first is not None:
+                rows = _chain1(first, rows)
+        self._build(fields, (tuple("" if r.get(f) is None else str(r.get(f)) for f in fields)
+                             for r in rows))
+
+    def _build(self, fields, value_rows):
+        """按行灌入列存储；value_rows 为与 fields 对齐的字符串元组。"""
+        self.fields = list(fields)
+        self.columns = {}
+        for f in self.fields:
+            if f in CODED_COLUMNS:
+                self.columns[f] = CodedColumn()
+            elif f == "price":
+                self.columns[f] = PriceColumn()
+            else:
+                self.columns[f] = []
+        self.by_element = {}
+        self._fallback = array("q")
+        self._row_hashes = hashes = array("q")     # 每行内容的 hash：热重载时据此找出改动的行
+        appenders = [self.columns[f].append for f in self.fields]
+        ei = self.fields.index("element") if "element" in self.columns else None
+        by_element, fallback = self.by_element, self._fallback
+        seen, collided = {}, set()      # 内容去重：hash → 首行号；hash 冲突时退回元组集合
+        i = -1
+        for i, values in enumerate(value_rows):
+            for add, v in zip(appenders, values):
+                add(v)
+            elem = values[ei] if ei is not None else ""
+            idx = by_element.get(elem)
+            if idx is None:
+                idx = by_element[elem] = array("q")
+            idx.append(i)
+            h = hash(values)
+            hashes.append(h)
+            j = seen.get(h)
+            if j is None:
+                seen[h] = i
+                fallback.append(i)
+            elif values not in collided and self._values(j) != values:
+                collided.add(values)
+                fallback.append(i)
+        self._n = i + 1
+
+    @classmethod
+    def from_columns(cls, fields, columns, n, by_element, fallback):
+        """直接由现成的列存储组装（快照加载用，不再逐行构建）。"""
+        self = cls.__new__(cls)
+        self.fields = list(fields)
+        self.columns = columns
+        self._n = n
+        self.by_element = by_element
+        self._fallback = fallback
+        return self
+
+    def _values(self, i):
+        return tuple(self.columns[f][i] for f in self.fields)
+
+    @classmethod
+    def from_values(cls, fields, value_rows):
+        """由与 fields 对齐的字符串元组构建。"""
+        self = cls.__new__(cls)
+        self._build(fields, value_rows)
+        return self
+
+    @classmethod
+    def from_csv(cls, path="data/styles.csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            fields, rows = csv_rows(f)
+            return cls.from_values(fields, rows)
+
+    def __reduce_ex__(self, protocol):
+        # 快照目录的列是 mmap 上的 memoryview，不能 pickle：
+        # 传给 spawn / forkserver 启动的子进程时只传快照路径，由子进程重新 mmap
+        snap = self.__dict__.get("_snapshot")
+        if snap is not None:
+            return _reopen_snapshot, (snap,)
+        return super().__reduce_ex__(protocol)
+
+    @classmethod
+    def of(cls, styles):
+        return styles if isinstance(styles, cls) else cls(styles)
+
+    @property
+    def version(self):
+        """进程内唯一的版本号：每个新加载 / 新替换的目录对象各不相同（结果缓存据此失效）。"""
+        v = self.__dict__.get("_version")
+        if v is None:
+            v = self._version = next(_VERSIONS)
+        return v
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        return (StyleRow(self, i) for i in range(self._n))
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return StyleRow(self, i)
+
+    def element_of(self, i):
+        col = self.columns.get("element")
+        return col[i] if col is not None else ""
+
+    def pick(self, favored, k=3):
+        """
+        返回与旧版 pick_styles 完全相同的 k 行：
+        1) 元素落在 favored 内的行，按 CSV 顺序；
+        2) 不足 k 行时，用其余行（按内容去重）按 CSV 顺序补位。
+        """
+        if k <= 0:
+            return []
+        lists = [self.by_element[e] for e in set(favored) if e in self.by_element]
+        if len(lists) == 1:
+            idx = list(lists[0][:k])
+        else:
+            idx = list(islice(heapq.merge(*lists), k))
+        if len(idx) < k:
+            fav = set(favored)
+            for i in self._fallback:
+                if self.element_of(i) not in fav:
+                    idx.append(i)
+                    if len(idx) >= k:
+                        break
+        return [StyleRow(self, i) for i in idx]
+
+
+def _reopen_snapshot(path):
+    from .snapshot import load_snapshot
+    cat = load_snapshot(path)
+    if cat is None:
+        raise ValueError(f"snapshot {path} is missing or no longer valid")
+    return cat
+
+
+def _chain1(first, rest):
+    yield first
+    yield from rest
+
+
+class CatalogCache:
+    """
+    进程级目录缓存：同一文件只解析一次，所有会话 / 重跑共享同一个 StyleCatalog。
+    仅当文件的 (mtime, size) 变化时重新加载：按 sku 做行级 diff，能增量就只改变动的行
+    （见 fortune/reload.py），替换后旧目录对象保持不变。
+    计数：hits（直接复用）、misses（首次加载）、reloads（文件变化后重载，其中 incremental 为增量）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}              # abspath → (签名, 目录)
+        self.hits = self.misses = self.reloads = self.incremental = 0
+
+    def get(self, path):
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        sig = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == sig:
+            self.hits += 1
+            return entry[1]
+        with self._lock:                # 并发会话只让一个去解析
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+            if entry is None:
+                catalog = _load_fresh(key)
+                self.misses += 1
+            else:
+                from .reload import reload_catalog
+                catalog, report = reload_catalog(entry[1], key)
+                self.reloads += 1
+                self.incremental += report["mode"] == "incremental"
+            self._entries[key] = (sig, catalog)
+            return catalog
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "reloads": self.reloads,
+                "incremental": self.incremental, "entries": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _load_fresh(path):
+    """优先 mmap 同名 .snap 快照；快照缺失、版本不符或已过期时回退解析 CSV。"""
+    from .snapshot import load_snapshot_for
+    catalog = load_snapshot_for(path)
+    return catalog if catalog is not None else StyleCatalog.from_csv(path)
+
+
+_CACHE = CatalogCache()
+
+
+def load_catalog(path="data/styles.csv"):
+    """按 mtime/size 缓存的目录加载（有新鲜快照时走 mmap）；文件未变时返回同一个对象。"""
+    with metrics.timed("load"):
+        return _CACHE.get(path)
+
+
+load_styles = load_catalog                 # 入口脚本沿用的旧名
+
+
+def catalog_cache_stats():
+    return _CACHE.stats()
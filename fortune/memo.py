@@ -0,0 +1,127 @@
+# fortune/memo.py —— 解读结果缓存（LRU + TTL）
+# 同一个目录版本下，解读只取决于归一化后的输入：
+#   (月份 1..12 / 0, 目标, 梅花末位数字, 语言, 个性化条件)
+# 名字、原始的 "2025-09" / "2025/9" 写法、梅花前面几个数都不影响结果，所以不进键。
+# 目录对象一换（文件变了、热重载），version 就变，整张缓存随之作废。
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from .answers import lookup_answer, normalize_digit, normalize_month
+from .query import has_constraints, pick_styles
+from .rules import compute_score, suggestions_from_keys
+
+Reading = namedtuple("Reading", "month_elem extra_elem favored picks score tips")
+
+
+class LRUCache:
+    """
+    线程安全的 LRU：条目数上限 maxsize，每条存活 ttl 秒（None = 不过期）。
+    计数：hits、misses、evictions（超出容量被挤出）、expirations（过期被丢弃）。
+    """
+
+    def __init__(self, maxsize=4096, ttl=3600.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data = OrderedDict()      # 键 → (过期时刻, 值)
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                if item[0] is None or item[0] > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        looked = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "expirations": self.expirations, "size": len(self._data),
+                "hit_rate": self.hits / looked if looked else 0.0}
+
+
+def _tags(values):
+    return tuple(sorted(set(values))) if values else None
+
+
+def compute_reading(catalog, ym, goal, nums=None, lang="en", constraints=None):
+    """不查缓存的一次解读：答案表 + （有条件时）重算选款与评分 + 当前语言的建议。"""
+    constraints = constraints or {}
+    ans = lookup_answer(catalog, ym, goal, nums)
+    picks, score = ans.picks, ans.score
+    if has_constraints(**constraints):
+        picks = tuple(pick_styles(ans.favored, catalog, 3, **constraints))
+        score = compute_score(goal, ans.month_elem, ans.extra_elem, picks, ans.favored)
+    return Reading(ans.month_elem, ans.extra_elem, ans.favored, picks, score,
+                   tuple(suggestions_from_keys(lang, ans.tip_keys)))
+
+
+class ReadingCache:
+    """按目录版本自动作废的解读缓存；invalidations 记录因目录变化清空的次数。"""
+
+    def __init__(self, maxsize=4096, ttl=3600.0):
+        self.lru = LRUCache(maxsize, ttl)
+        self.invalidations = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def key(self, ym, goal, nums=None, lang="en", constraints=None):
+        c = constraints or {}
+        return (normalize_month(ym), goal, normalize_digit(nums), lang,
+                _tags(c.get("vibes")), _tags(c.get("tones")), c.get("min_price"), c.get("max_price"))
+
+    def get(self, catalog, ym, goal, nums=None, lang="en", constraints=None):
+        version = catalog.version
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    if self._version is not None:
+                        self.invalidations += 1
+                    self.lru.clear()
+                    self._version = version
+        key = self.key(ym, goal, nums, lang, constraints)
+        hit = self.lru.get(key)
+        if hit is None:
+            hit = compute_reading(catalog, ym, goal, nums, lang, constraints)
+            if catalog.version == self._version:    # 计算期间目录被换掉：结果不入缓存
+                self.lru.put(key, hit)
+        return hit
+
+    def stats(self):
+        return dict(self.lru.stats(), invalidations=self.invalidations, version=self._version)
+
+
+_DEFAULT = ReadingCache()
+
+
+def cached_reading(catalog, ym, goal, nums=None, lang="en", constraints=None):
+    """进程级共享的解读缓存（Streamlit 各会话、各次重跑共用）。"""
+    return _DEFAULT.get(catalog, ym, goal, nums, lang, constraints)
+
+
+def reading_cache_stats():
+    return _DEFAULT.stats()
@@ -0,0 +1,196 @@
+# fortune/metrics.py —— 可选的分阶段计时与计数（默认关闭）
+# 打开：环境变量 FORTUNE_METRICS=1，或调用 enable()；入口脚本的 --metrics 参数会自动打开。
+# 关闭时 timed() 返回同一个空上下文、count() 直接返回，热路径只多一次全局变量判断。
+#
+#   with metrics.timed("pick"):
+#       picks = pick_styles(...)
+#   metrics.count("fortune_picks_total", kind="fallback")
+#
+# 导出：render_prometheus()（Prometheus 文本格式）或 snapshot() / dump(path)（JSON）。
+# 目录缓存与答案表的命中数不在热路径上计，导出时从各自的计数器收集。
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.environ.get("FORTUNE_METRICS", "") not in ("", "0")
+
+# 延迟分桶（秒）：单次选款是微秒级，冷加载 1M 行目录是秒级
+BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+           1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_METRIC = "fortune_stage_seconds"
+
+_HELP = {
+    STAGE_METRIC: ("histogram", "Latency of reading pipeline stages."),
+    "fortune_picks_total": ("counter", "Styles returned by pick_styles, by favored / fallback."),
+    "fortune_pick_fallbacks_total": ("counter", "pick_styles calls that had to fill with non-favored styles."),
+    "fortune_readings_total": ("counter", "Readings produced, by entry point."),
+    "fortune_catalog_cache_total": ("counter", "Catalog cache lookups, by result."),
+    "fortune_answer_table_total": ("counter", "Precompiled answer table lookups, by result."),
+    "fortune_reading_cache_total": ("counter", "Memoized reading lookups and evictions, by result."),
+}
+
+_lock = threading.Lock()
+_hist = {}          # (名字, 标签元组) → [各桶计数..., +Inf 计数, 总和]
+_counters = {}      # (名字, 标签元组) → 值
+_NULL = contextlib.nullcontext()
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = bool(on)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(seconds, stage, name=STAGE_METRIC):
+    if not ENABLED:
+        return
+    key = _key(name, {"stage": stage})
+    with _lock:
+        h = _hist.get(key)
+        if h is None:
+            h = _hist[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        h[bisect_left(BUCKETS, seconds)] += 1
+        h[-1] += seconds
+
+
+def count(name, n=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+class _Timer:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(time.perf_counter() - self.t0, self.stage)
+
+
+def timed(stage):
+    """计时上下文；关闭时返回共享的空上下文，不分配对象。"""
+    return _Timer(stage) if ENABLED else _NULL
+
+
+# ---------- 导出时收集的外部计数 ----------
+def _collected():
+    from .answers import answer_table_stats
+    from .catalog import catalog_cache_stats
+    cache = catalog_cache_stats()
+    table = answer_table_stats()
+    out = {_key("fortune_catalog_cache_total", {"result": r}): cache[k]
+           for r, k in (("hit", "hits"), ("miss", "misses"), ("reload", "reloads"),
+                        ("incremental_reload", "incremental"))}
+    out.update((_key("fortune_answer_table_total", {"result": r}), table[k])
+               for r, k in (("hit", "hits"), ("miss", "misses"), ("build", "builds")))
+    memo = sys.modules.get("fortune.memo")          # 没用到结果缓存就不导入它
+    if memo is not None:
+        rc = memo.reading_cache_stats()
+        out.update((_key("fortune_reading_cache_total", {"result": r}), rc[k])
+                   for r, k in (("hit", "hits"), ("miss", "misses"), ("eviction", "evictions"),
+                                ("expiration", "expirations"), ("invalidation", "invalidations")))
+    return out
+
+
+# ---------- 跨进程合并（批量模式的工作进程） ----------
+def take():
+    """取走本进程累计的数据并清零（工作进程每块结果附带一次）。"""
+    with _lock:
+        state = {"hist": dict(_hist), "counters": dict(_counters)}
+        _hist.clear()
+        _counters.clear()
+    return state
+
+
+def merge(state):
+    with _lock:
+        for key, h in state["hist"].items():
+            mine = _hist.get(key)
+            _hist[key] = list(h) if mine is None else [a + b for a, b in zip(mine, h)]
+        for key, v in state["counters"].items():
+            _counters[key] = _counters.get(key, 0) + v
+
+
+def reset():
+    take()
+
+
+# ---------- 导出 ----------
+def _labels(pairs, extra=()):
+    items = list(pairs) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def _fmt(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render_prometheus():
+    with _lock:
+        hist = sorted(_hist.items())
+        counters = dict(_counters)
+    counters.update(_collected())
+    out, seen = [], set()
+
+    def header(name):
+        if name not in seen:
+            seen.add(name)
+            kind, text = _HELP.get(name, ("counter", name))
+            out.append(f"# HELP {name} {text}")
+            out.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), h in hist:
+        header(name)
+        cum = 0
+        for le, n in zip(BUCKETS + ("+Inf",), h[:-1]):
+            cum += n
+            out.append(f"{name}_bucket{_labels(labels, [('le', le)])} {cum}")
+        out.append(f"{name}_sum{_labels(labels)} {_fmt(h[-1])}")
+        out.append(f"{name}_count{_labels(labels)} {cum}")
+    for (name, labels), v in sorted(counters.items()):
+        header(name)
+        out.append(f"{name}{_labels(labels)} {_fmt(v)}")
+    return "\n".join(out) + "\n"
+
+
+def snapshot():
+    """JSON 友好的快照：直方图给出各桶计数（非累计）、总和、次数与均值。"""
+    with _lock:
+        hist = sorted(_hist.items())
+        counters = dict(_counters)
+    counters.update(_collected())
+    stages = {}
+    for (name, labels), h in hist:
+        n = sum(h[:-1])
+        stages[dict(labels).get("stage", name)] = {
+            "count": n, "sum_seconds": h[-1], "mean_seconds": h[-1] / n if n else 0.0,
+            "buckets": {str(le): c for le, c in zip(BUCKETS + ("+Inf",), h[:-1]) if c},
+        }
+    return {"enabled": ENABLED, "stages": stages,
+            "counters": [{"name": name, "labels": dict(labels), "value": v}
+                         for (name, labels), v in sorted(counters.items())]}
+
+
+def dump(path):
+    """按扩展名写出：.prom / .txt 为 Prometheus 文本，其余为 JSON。"""
+    text = render_prometheus() if str(path).endswith((".prom", ".txt")) \
+        else json.dumps(snapshot(), ensure_ascii=False, indent=2)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
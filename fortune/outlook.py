@@ -0,0 +1,77 @@
+# fortune/outlook.py —— 年度展望：一次调用算出一段 YYYY-MM 月份的解读
+# 同一个用户、同一个目标下，逐月解读里大部分工作是重复的：
+#   - 目标偏好、梅花元素与月份无关，只算一次；
+#   - 月份元素只有 5 种（MONTH_TO_ELEMENT），主导元素相同的月份 favored / 选款完全相同，
+#     按元素分组后每组只算一次：12 个月最多 5 次选款，渲染时款式行也按组复用。
+#
+#   months = parse_months("12", "2025-09")          # 2025-09 … 2026-08
+#   months = parse_months("2025-01..2025-12")
+#   for m in year_outlook(months, "wealth", lambda fav: pick_styles(fav, styles, 3)):
+#       m.ym, m.month_elem, m.favored, m.picks
+from collections import namedtuple
+
+from . import metrics
+from .rules import MONTH_TO_ELEMENT, favored_elements
+
+MAX_MONTHS = 120                # 一次最多 10 年
+
+OutlookMonth = namedtuple("OutlookMonth", "ym month_elem favored picks")
+
+
+def _year_month(ym):
+    """"2025-09" / "2025/9" → (2025, 9)；格式不对或月份越界时抛 ValueError。"""
+    token = str(ym).strip().replace("/", "-")
+    y, sep, m = token.partition("-")
+    try:
+        y, m = int(y), int(m)
+    except ValueError:
+        y = m = None
+    if not sep or m is None or not 1 <= m <= 12:
+        raise ValueError(f"bad month {ym!r}, expected YYYY-MM")
+    return y, m
+
+
+def month_range(start, months=12):
+    """"2025-09", 3 → ["2025-09", "2025-10", "2025-11"]（跨年自动进位）。"""
+    if not 1 <= months <= MAX_MONTHS:
+        raise ValueError(f"month count must be 1..{MAX_MONTHS}")
+    y, m = _year_month(start)
+    first = y * 12 + m - 1
+    return [f"{k // 12:04d}-{k % 12 + 1:02d}" for k in range(first, first + months)]
+
+
+def parse_months(spec, start=None):
+    """
+    月份范围：
+    - "2025-01..2025-12"：闭区间；
+    - "12"：从 start 起的 12 个月。
+    """
+    spec = str(spec).strip()
+    if ".." in spec:
+        a, b = (x.strip() for x in spec.split("..", 1))
+        ya, ma = _year_month(a)
+        yb, mb = _year_month(b)
+        count = (yb * 12 + mb) - (ya * 12 + ma) + 1
+        if count < 1:
+            raise ValueError(f"empty month range {spec!r}")
+        return month_range(a, count)
+    try:
+        count = int(spec)
+    except ValueError:
+        raise ValueError(f"bad month range {spec!r}, expected N or YYYY-MM..YYYY-MM") from None
+    if start is None:
+        raise ValueError("a start month is required for a month count")
+    return month_range(start, count)
+
+
+def year_outlook(months, goal, pick, extra_elem=None):
+    """
+    months：YYYY-MM 列表；pick(favored) → 该组的选款（由调用方决定 pick_styles / rank_styles 与条件）。
+    按 months 顺序返回 OutlookMonth；主导元素相同的月份共享同一个 favored 与 picks 对象。
+    先解析全部月份（计入 "resolve"），再按组选款（选款自己计时），两段耗时不重叠。
+    """
+    with metrics.timed("resolve"):
+        elems = [MONTH_TO_ELEMENT.get(str(_year_month(ym)[1]), "earth") for ym in months]
+        favored = {e: favored_elements(goal, e, extra_elem) for e in dict.fromkeys(elems)}
+    picks = {e: pick(fav) for e, fav in favored.items()}
+    return [OutlookMonth(ym, e, favored[e], picks[e]) for ym, e in zip(months, elems)]
@@ -0,0 +1,68 @@
+# fortune/parallel.py —— 多进程批量生成
+# 管线（month_element → favored_elements → pick_styles → compute_score → render）
+# 是纯 CPU、无共享状态的，所以按块分发给进程池即可线性扩展。
+import os
+from collections import deque
+from itertools import islice
+
+from . import metrics
+
+# 每个工作进程的全局状态：由 initializer 设置一次，之后所有任务复用
+_FUNC = None
+_STYLES = None
+
+
+def _init(func, styles, metrics_on=False):
+    global _FUNC, _STYLES
+    _FUNC, _STYLES = func, styles
+    metrics.reset()                         # fork 继承了父进程的累计值，不能再报一遍
+    metrics.enable(metrics_on)
+
+
+def _run_chunk(chunk):
+    """一块的结果；开了统计时附带本块的计时/计数，由父进程合并。"""
+    out = [_FUNC(item, _STYLES) for item in chunk]
+    return out, (metrics.take() if metrics.ENABLED else None)
+
+
+def _collect(result):
+    out, state = result.get()
+    if state is not None:
+        metrics.merge(state)
+    return out
+
+
+def _chunks(items, size):
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_map(func, items, styles, workers=None, chunksize=256, context=None):
+    """
+    依次产出 func(item, styles)，顺序与输入完全一致。
+    - styles（目录）经 Pool initializer 每个进程只传一次，不随任务重复 pickle；
+      fork 启动方式下直接继承父进程内存。
+    - 在途块数限制为 workers*2，输入再大内存也恒定。
+    - workers <= 1 时在本进程内执行，结果与多进程逐条相同。
+    func 必须是模块级函数（或其 functools.partial），以便子进程按名引用。
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for item in items:
+            yield func(item, styles)
+        return
+
+    import multiprocessing as mp            # 只有真的开进程池时才付导入开销
+    ctx = mp.get_context(context) if context else mp.get_context()
+    with ctx.Pool(workers, initializer=_init, initargs=(func, styles, metrics.ENABLED)) as pool:
+        pending = deque()
+        for chunk in _chunks(items, chunksize):
+            pending.append(pool.apply_async(_run_chunk, (chunk,)))
+            if len(pending) >= workers * 2:
+                yield from _collect(pending.popleft())
+        while pending:
+            yield from _collect(pending.popleft())
@@ -0,0 +1,219 @@
+# fortune/query.py —— 目录查询层：vibe 标签 / tone 倒排索引 + 价格有序索引
+# 例：“金或土、vibe 含 Focus、£15 以内” =
+#     query(cat, elements=["metal","earth"], vibes=["Focus"], max_price=15)
+# 先挑最小的一个索引做驱动，其余条件按列编码 O(1) 探测，不扫描整个目录。
+import heapq
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from . import metrics
+from .catalog import StyleCatalog
+
+MAX_PRICE_RUNS = 256            # 价格驱动最多合并这么多段（每段一个价格）
+
+
+class QueryIndex:
+    """某个目录的查询索引：首次查询时建立，缓存在目录对象上。"""
+
+    def __init__(self, cat):
+        self.cat = cat
+        vibe, tone = cat.columns.get("vibe"), cat.columns.get("tone")
+        # vibe 文本（如 "Focus|Calm"）按词表只拆一次
+        self.vibe_tags = [frozenset(t.strip() for t in v.split("|") if t.strip())
+                          for v in (vibe.vocab if vibe is not None else [])]
+        self.by_tag = {}
+        self.by_tone = {}
+        for i in range(len(cat)):
+            if vibe is not None:
+                for t in self.vibe_tags[vibe.codes[i]]:
+                    self.by_tag.setdefault(t, array("q")).append(i)
+            if tone is not None:
+                self.by_tone.setdefault(tone[i], array("q")).append(i)
+        # 价格索引：按 (分, 行号) 排序；无价格的行不进索引
+        price = cat.columns.get("price")
+        order = sorted((price.cents[i], i) for i in range(len(cat))
+                       if price is not None and price.decimals[i] >= 0)
+        self.price_keys = array("q", (c for c, _ in order))
+        self.price_rows = array("q", (i for _, i in order))
+
+    @classmethod
+    def of(cls, cat):
+        idx = cat.__dict__.get("_query_index")
+        if idx is None:
+            idx = cat._query_index = cls(cat)
+        return idx
+
+    def tags(self):
+        return sorted(self.by_tag)
+
+    def _union(self, index, keys):
+        lists = [index[k] for k in dict.fromkeys(keys) if k in index]
+        if len(lists) == 1:
+            return lists[0], len(lists[0])
+        return _dedup(heapq.merge(*lists)), sum(len(x) for x in lists)
+
+    def select(self, elements=None, vibes=None, tones=None, min_price=None, max_price=None):
+        """
+        按 CSV 顺序惰性产出满足全部条件的行号（各条件内部为“任一”）。
+        价格区间为闭区间、单位英镑；给了价格条件时没有价格的行不入选。
+        """
+        cat = self.cat
+        drivers, probes = [], []
+        if elements is not None:
+            src, n = self._union(cat.by_element, elements)
+            drivers.append((n, src))
+            want_e = set(elements)
+            probes.append(lambda i: cat.element_of(i) in want_e)
+        if vibes is not None:
+            src, n = self._union(self.by_tag, vibes)
+            drivers.append((n, src))
+            want_v = set(vibes)
+            vibe = cat.columns.get("vibe")
+            tags = self.vibe_tags
+            probes.append(lambda i: vibe is not None and not want_v.isdisjoint(tags[vibe.codes[i]]))
+        if tones is not None:
+            src, n = self._union(self.by_tone, tones)
+            drivers.append((n, src))
+            want_t = set(tones)
+            tone = cat.columns.get("tone")
+            probes.append(lambda i: tone is not None and tone[i] in want_t)
+        if min_price is not None or max_price is not None:
+            lo = 0 if min_price is None else bisect_left(self.price_keys, round(min_price * 100))
+            hi = len(self.price_keys) if max_price is None \
+                else bisect_right(self.price_keys, round(max_price * 100))
+            hi = max(lo, hi)
+            drivers.append((hi - lo, None))
+            price = cat.columns.get("price")
+            cents, decimals = (price.cents, price.decimals) if price is not None else ((), ())
+            lo_c = None if min_price is None else round(min_price * 100)
+            hi_c = None if max_price is None else round(max_price * 100)
+            probes.append(lambda i: price is not None and decimals[i] >= 0
+                          and (lo_c is None or cents[i] >= lo_c)
+                          and (hi_c is None or cents[i] <= hi_c))
+            price_span = (lo, hi)
+        if not drivers:
+            return iter(range(len(cat)))
+        # 最小的索引做驱动；价格驱动按 CSV 顺序惰性产出（见 _price_driver），不排序整段区间
+        n, src = min(drivers, key=lambda d: d[0])
+        if src is None:
+            src = self._price_driver(*price_span)
+        return (i for i in src if all(p(i) for p in probes))
+
+    def _price_driver(self, lo, hi):
+        """
+        价格区间 [lo, hi) 内的行号，按 CSV 顺序惰性产出。
+        price_rows 按 (分, 行号) 排序：同一价格的一段本身就是 CSV 顺序，
+        把各段 heapq.merge 起来即可，不复制、不排序，取够 k 个就停。
+        区间内价格种类太多时改为按 CSV 顺序扫描、逐行 O(1) 探测价格（同样取够即停）。
+        """
+        keys = self.price_keys
+        runs, a = [], lo
+        while a < hi:
+            if len(runs) >= MAX_PRICE_RUNS:
+                return iter(range(len(self.cat)))
+            b = bisect_right(keys, keys[a], a, hi)
+            runs.append((a, b))
+            a = b
+        rows = memoryview(self.price_rows)
+        if len(runs) == 1:
+            return iter(rows[lo:hi])
+        return heapq.merge(*(rows[a:b] for a, b in runs))
+
+
+def _dedup(sorted_ids):
+    """有序行号流去重（同一行可能同时挂在多个标签下）。"""
+    last = -1
+    for i in sorted_ids:
+        if i != last:
+            yield i
+            last = i
+
+
+def query(styles, elements=None, vibes=None, tones=None, min_price=None, max_price=None):
+    """满足条件的行（StyleRow），按 CSV 顺序。"""
+    cat = StyleCatalog.of(styles)
+    sel = QueryIndex.of(cat).select(elements, vibes, tones, min_price, max_price)
+    return [cat[i] for i in sel]
+
+
+def has_constraints(vibes=None, tones=None, min_price=None, max_price=None):
+    return bool(vibes) or bool(tones) or min_price is not None or max_price is not None
+
+
+# ---------- 条件的归一化（命令行 / JSONL / HTTP 共用）----------
+def parse_tags(value):
+    """vibes / tones：列表，或逗号分隔的字符串（"Focus, Calm"）；空 → None。格式不对抛 ValueError。"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return [x.strip() for x in value.split(",") if x.strip()] or None
+    if isinstance(value, (list, tuple)):
+        return [str(x) for x in value] or None
+    raise ValueError("vibes/tones must be a list or a comma-separated string")
+
+
+def parse_price(value):
+    """min_price / max_price：数字或数字字符串（英镑）；空 → None。非数字、nan / inf 抛 ValueError。"""
+    if value is None or value == "":
+        return None
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("min_price/max_price must be numbers") from None
+    if not math.isfinite(price):        # "nan" / "inf" / 1e400：换算成分时会溢出
+        raise ValueError("min_price/max_price must be finite numbers")
+    return price
+
+
+def parse_constraints(vibes=None, tones=None, min_price=None, max_price=None):
+    """四个条件一起归一化，返回 pick_styles 可直接使用的 dict。"""
+    return {"vibes": parse_tags(vibes), "tones": parse_tags(tones),
+            "min_price": parse_price(min_price), "max_price": parse_price(max_price)}
+
+
+def pick_constrained(favored, styles, k=3, vibes=None, tones=None, min_price=None, max_price=None):
+    """
+    带个性化条件的选款：
+    1) 满足条件且元素在 favored 内的行（CSV 顺序）；
+    2) 不足时补满足条件的其他行；
+    3) 仍不足时用不带条件的 pick 结果补位（跳过已选）。
+    没有任何条件时与 StyleCatalog.pick 完全相同。
+    """
+    cat = StyleCatalog.of(styles)
+    vibes = vibes or None
+    tones = tones or None
+    if not has_constraints(vibes, tones, min_price, max_price):
+        return cat.pick(favored, k)
+    if k <= 0:
+        return []
+    qi = QueryIndex.of(cat)
+    cond = dict(vibes=vibes, tones=tones, min_price=min_price, max_price=max_price)
+    chosen = list(islice(qi.select(elements=favored, **cond), k))
+    if len(chosen) < k:
+        taken = set(chosen)
+        fav = set(favored)
+        chosen += islice((i for i in qi.select(**cond)
+                          if i not in taken and cat.element_of(i) not in fav), k - len(chosen))
+    rows = [cat[i] for i in chosen]
+    if len(rows) < k:
+        taken = set(chosen)
+        rows += [r for r in cat.pick(favored, k + len(rows))
+                 if r._i not in taken][:k - len(rows)]
+    return rows
+
+
+def pick_styles(favored, styles, k=3, **constraints):
+    """三个入口共用的选款：constraints 为 vibes / tones / min_price / max_price。"""
+    if not metrics.ENABLED:
+        return pick_constrained(favored, styles, k, **constraints)
+    with metrics.timed("pick"):
+        rows = pick_constrained(favored, styles, k, **constraints)
+    fav = set(favored)
+    fallback = sum(1 for r in rows if (r.get("element") or "") not in fav)
+    metrics.count("fortune_picks_total", len(rows) - fallback, kind="favored")
+    metrics.count("fortune_picks_total", fallback, kind="fallback")
+    if fallback:
+        metrics.count("fortune_pick_fallbacks_total")
+    return rows
@@ -0,0 +1,193 @@
+# fortune/ranking.py —— 打分排序的 top-k 选款
+# pick() 只取“元素命中的前 k 行”；这里按 元素排名 + 氛围/目标契合 + 预算 给候选打分，
+# 按分数逐级取段、同分段用有界堆归并，凑满 k 行即停，不扫描整个目录。
+# 有预算时每组按价格预先排好（首次用到该组时建立），预算线处二分切成“预算内 / 无价格 / 超预算”三段，
+# 不再逐请求过滤整组。
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from .catalog import StyleCatalog
+
+# 目标 → 契合的氛围标签及权重（vibe 列形如 "Focus|Calm"）
+GOAL_VIBES = {
+    "career":  {"Focus": 30, "Bold": 20},
+    "wealth":  {"Radiant": 30, "Bold": 20},
+    "health":  {"Heal": 30, "Calm": 20},
+    "emotion": {"Calm": 30, "Heal": 20},
+    "love":    {"Radiant": 30, "Social": 20},
+    "study":   {"Focus": 30, "Calm": 20},
+    "social":  {"Social": 30, "Radiant": 20},
+}
+RANK_WEIGHTS = (100, 80, 60, 40, 20)    # favored 中第 1、2、3… 位的权重
+IN_BUDGET, OVER_BUDGET = 15, -25        # 预算内加分 / 超预算扣分；无价格不加减
+
+
+def _groups(cat):
+    """(元素, vibe 文本) → 行号 array（CSV 顺序）。每个目录只建一次。"""
+    groups = getattr(cat, "_rank_groups", None)
+    if groups is None:
+        elem = cat.columns.get("element")
+        vibe = cat.columns.get("vibe")
+        groups = {}
+        for i in range(len(cat)):
+            key = (elem[i] if elem is not None else "", vibe[i] if vibe is not None else "")
+            idx = groups.get(key)
+            if idx is None:
+                idx = groups[key] = array("q")
+            idx.append(i)
+        cat._rank_groups = groups
+    return groups
+
+
+def vibe_affinity(goal, vibe_text):
+    weights = GOAL_VIBES.get(goal)
+    if not weights or not vibe_text:
+        return 0
+    return sum(weights.get(t.strip(), 0) for t in vibe_text.split("|"))
+
+
+def _where(idx, fit, want):
+    return (i for i in idx if fit(i) == want)
+
+
+def _price_split(cat, key, idx):
+    """
+    某个分组的价格视图（按组缓存在目录上，首次用到时建立）：
+    (分 升序, 对应行号, 各价格段起点 + 末尾, 无价格的行号)。同一价格段内行号为 CSV 顺序。
+    """
+    splits = cat.__dict__.setdefault("_rank_prices", {})
+    split = splits.get(key)
+    if split is None:
+        price = cat.columns["price"]
+        cents, decimals = price.cents, price.decimals
+        priced = sorted((cents[i], i) for i in idx if decimals[i] >= 0)
+        keys = array("q", (c for c, _ in priced))
+        rows = array("q", (i for _, i in priced))
+        starts = array("q", (j for j in range(len(keys)) if j == 0 or keys[j] != keys[j - 1]))
+        starts.append(len(keys))
+        split = splits[key] = (keys, rows, starts, array("q", (i for i in idx if decimals[i] < 0)))
+    return split
+
+
+def _runs(idx, rows, starts, a, b, fit, want, k):
+    """
+    价格段 a..b-1 的行，按 CSV 顺序惰性产出：把各段（本身即 CSV 顺序）heapq.merge 起来。
+    段数多、而这些行在组内又很密时，直接按 CSV 顺序过滤整组更快（期望只看 k·组大小/行数 行）。
+    """
+    n = starts[b] - starts[a]
+    if not n:
+        return None
+    if b - a == 1:
+        return iter(memoryview(rows)[starts[a]:starts[b]])
+    if k * len(idx) < (b - a) * n:
+        return _where(idx, fit, want)
+    mv = memoryview(rows)
+    return heapq.merge(*(mv[starts[t]:starts[t + 1]] for t in range(a, b)))
+
+
+def _best_offset(cat, price, limit):
+    """整个目录在预算 limit 下可能拿到的最高预算加分（用作展开分组的上界，越紧展开得越少）。"""
+    floor = cat.__dict__.get("_rank_price_floor")
+    if floor is None:
+        cents, decimals = price.cents, price.decimals
+        if not len(decimals) or min(decimals) >= 0:
+            floor = (min(cents, default=None), False)
+        else:
+            floor = (min((c for c, d in zip(cents, decimals) if d >= 0), default=None), True)
+        cat._rank_price_floor = floor
+    lowest, noprice = floor
+    if lowest is not None and lowest <= limit:
+        return IN_BUDGET
+    return 0 if noprice else OVER_BUDGET
+
+
+def _segments(cat, key, idx, fit, limit, k):
+    """一个分组在预算 limit（分）下的 (加分, 行迭代器) 段：预算内 / 无价格 / 超预算。"""
+    keys, rows, starts, noprice = _price_split(cat, key, idx)
+    r = bisect_left(starts, bisect_right(keys, limit))     # 预算内的价格段数
+    return ((IN_BUDGET, _runs(idx, rows, starts, 0, r, fit, 1, k)),
+            (0, iter(noprice) if noprice else None),
+            (OVER_BUDGET, _runs(idx, rows, starts, r, len(starts) - 1, fit, -1, k)))
+
+
+def _plan(cat, favored, goal):
+    """
+    (层级, -基础分, 行号 array, 分组键) 按优先级排好序的分组列表。
+    输入空间很小（目标 × favored 序列），所以按 (goal, favored) 缓存在目录上。
+    """
+    plans = cat.__dict__.setdefault("_rank_plans", {})
+    key = (goal, tuple(favored))
+    plan = plans.get(key)
+    if plan is None:
+        rank = {e: r for r, e in enumerate(dict.fromkeys(favored))}
+        plan = []
+        for (elem, vibe_text), idx in _groups(cat).items():
+            r = rank.get(elem)
+            base = (RANK_WEIGHTS[r] if r is not None and r < len(RANK_WEIGHTS) else 0) \
+                + vibe_affinity(goal, vibe_text)
+            plan.append((0 if r is not None else 1, -base, idx, (elem, vibe_text)))
+        plan.sort(key=lambda g: (g[0], g[1]))
+        plans[key] = plan
+    return plan
+
+
+def rank_styles(favored, styles, k=3, goal=None, budget=None):
+    """
+    返回得分最高的 k 行（StyleRow）：
+    - 元素命中 favored 的行总是排在未命中的行之前（与 pick 相同的兜底语义）；
+    - 分数 = favored 排名权重 + 目标氛围契合 + 预算契合；同分按 CSV 顺序。
+    budget 单位为英镑，None 表示不看价格。
+    """
+    cat = StyleCatalog.of(styles)
+    if k <= 0:
+        return []
+    plan = _plan(cat, favored, goal)
+    price = cat.columns.get("price")
+    fit, limit, top = None, None, 0         # 无预算：分数在组内恒定，整组一段
+    if budget is not None and price is not None:
+        limit = round(budget * 100)
+        cents, decimals = price.cents, price.decimals
+        top = _best_offset(cat, price, limit)
+
+        def fit(i):
+            if decimals[i] < 0:
+                return 0
+            return 1 if cents[i] <= limit else -1
+
+    # 有界堆：只展开“最好情况下仍可能进入前 k”的分组；每组按预算拆成分数恒定的段
+    heap, out, p, seq = [], [], 0, 0
+    while len(out) < k:
+        while p < len(plan) and (not heap or (plan[p][0], plan[p][1] - top) <= heap[0][:2]):
+            tier, neg, idx, key = plan[p]
+            segments = ((0, idx),) if fit is None else _segments(cat, key, idx, fit, limit, k)
+            for off, rows in segments:
+                if rows is not None:
+                    heapq.heappush(heap, (tier, neg - off, seq, rows))
+                    seq += 1
+            p += 1
+        if not heap:
+            break
+        level = heap[0][:2]
+        same = []
+        while heap and heap[0][:2] == level:
+            same.append(heapq.heappop(heap)[3])
+        merged = same[0] if len(same) == 1 else heapq.merge(*same)
+        out.extend(islice(merged, k - len(out)))
+    return [cat[i] for i in out]
+
+
+def score_style(row, favored, goal=None, budget=None):
+    """单行的排序分（用于解释 / 调试），与 rank_styles 内部一致。"""
+    favored = list(dict.fromkeys(favored))
+    elem = row.get("element") or ""
+    r = favored.index(elem) if elem in favored else None
+    score = (RANK_WEIGHTS[r] if r is not None and r < len(RANK_WEIGHTS) else 0) \
+        + vibe_affinity(goal, row.get("vibe") or "")
+    if budget is not None:
+        try:
+            score += IN_BUDGET if float(row.get("price")) <= budget else OVER_BUDGET
+        except (TypeError, ValueError):
+            pass
+    return score
@@ -0,0 +1,466 @@
+# fortune/reload.py —— 目录热重载：按 sku 做行级 diff，增量更新索引后整体替换
+# styles.csv 被编辑后（常驻的 server / Streamlit 不用重启）：
+#   1) 流式解析新文件，逐行算内容 hash；按 sku 把新行与旧行对齐（保留下来的行相对顺序不变），
+#      得到 改动的行 / 删掉的行 / 插入的行（末尾追加也是插入）；
+#   2) 改动总数不超过目录的 MAX_INCREMENTAL → 增量：拷贝列存储（写时复制，旧目录原样保留），
+#      改行原位更新；有删行 / 中间插行时按保留的连续段重新拼接列，
+#      by_element / 去重补位序 / 已建好的查询索引与排序分组里的行号按 old → new 映射一次性平移；
+#   3) 改了表头、没有 sku 列，或改动太多（含大范围调序）→ 整体重建。
+# 比较时只留下变动 / 插入的行，不为整个文件分配行对象。
+# 新目录对象构建完成后才替换引用：正在进行的解读拿着的是旧对象，始终看到同一份完整目录；
+# 新对象的 version 不同，答案表 / 结果缓存 / 渲染缓存随之作废。
+#
+#   manager = CatalogManager("data/styles.csv")
+#   manager.watch(1.0)           # 后台线程每秒检查一次文件，重载不占用请求线程 / 事件循环
+#   cat = manager.get()          # 每次请求取一次：只读当前引用
+import csv
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+from .catalog import CodedColumn, PriceColumn, StyleCatalog, _load_fresh, copy_array, csv_rows
+
+MAX_INCREMENTAL = 0.25          # 改动行数超过目录的这个比例就直接整体重建
+
+
+def row_hashes(cat):
+    """每行内容的 hash（CSV 构建时顺带记下；快照加载的目录在首次重载时补算）。"""
+    hashes = cat.__dict__.get("_row_hashes")
+    if hashes is None:
+        hashes = cat._row_hashes = array("q", (hash(cat._values(i)) for i in range(len(cat))))
+    return hashes
+
+
+def _copy_column(col):
+    if isinstance(col, (CodedColumn, PriceColumn)):
+        return col.copy()
+    return list(col)                # 字符串列（含快照里的 PackedStrings）
+
+
+def _set(col, i, value):
+    if isinstance(col, list):
+        col[i] = value
+    else:
+        col.set(i, value)
+
+
+# ---------- 升序行号 array 的增删 ----------
+def _remove(index, key, i):
+    idx = index.get(key)
+    if idx is None:
+        return
+    j = bisect_left(idx, i)
+    if j < len(idx) and idx[j] == i:
+        del idx[j]
+        if not idx:
+            del index[key]
+
+
+def _insert(index, key, i):
+    idx = index.get(key)
+    if idx is None:
+        index[key] = array("q", [i])
+    else:
+        insort(idx, i)
+
+
+def _price_span(keys, rows, cents, i):
+    lo, hi = bisect_left(keys, cents), bisect_right(keys, cents)
+    return bisect_left(rows, i, lo, hi), hi
+
+
+def _price_remove(keys, rows, cents, i):
+    j, hi = _price_span(keys, rows, cents, i)
+    if j < hi and rows[j] == i:
+        del keys[j]
+        del rows[j]
+
+
+def _price_insert(keys, rows, cents, i):
+    j, _ = _price_span(keys, rows, cents, i)
+    keys.insert(j, cents)
+    rows.insert(j, i)
+
+
+def _remap(idx, newpos, lo):
+    """升序行号 array 里 ≥ lo 的行号按 newpos 平移（映射单调，平移后仍升序；< lo 的不动）。"""
+    j = bisect_left(idx, lo)
+    if j < len(idx):
+        idx[j:] = array("q", map(newpos.__getitem__, idx[j:]))
+
+
+def _pieces(n_old, removed, inserted):
+    """
+    新目录的行序列：range(a, b) 表示保留 old 的第 a..b-1 行，否则为插入行的值；
+    同时返回 old 行号 → 新行号 的映射（删掉的行为 -1）。
+    """
+    pieces, newpos = [], array("q")
+    a = t = r = k = 0
+    while a < n_old or k < len(inserted):
+        if k < len(inserted) and inserted[k][0] == t:
+            pieces.append(inserted[k][1])
+            t += 1
+            k += 1
+        elif r < len(removed) and removed[r] == a:
+            newpos.append(-1)
+            a += 1
+            r += 1
+        else:
+            b = removed[r] if r < len(removed) else n_old
+            if k < len(inserted):
+                b = min(b, a + inserted[k][0] - t)
+            pieces.append(range(a, b))
+            newpos.extend(range(t, t + b - a))
+            t += b - a
+            a = b
+    return pieces, newpos
+
+
+# ---------- 增量更新 ----------
+class _Patch:
+    """从 old 复制出 new，并按行号把 old → new 的改动同步到各个索引。"""
+
+    def __init__(self, old):
+        self.old = old
+        new = self.new = StyleCatalog.__new__(StyleCatalog)
+        new.fields = list(old.fields)
+        new.columns = {f: _copy_column(c) for f, c in old.columns.items()}
+        new._n = len(old)
+        new.by_element = {e: copy_array(idx, "q") for e, idx in old.by_element.items()}
+        new._fallback = copy_array(old._fallback, "q")
+        self.ei = new.fields.index("element") if "element" in new.columns else None
+        self.cols = [new.columns[f] for f in new.fields]
+        self.query = self._copy_query(old.__dict__.get("_query_index"))
+        groups = old.__dict__.get("_rank_groups")
+        self.groups = None if groups is None else {k: copy_array(v, "q") for k, v in groups.items()}
+
+    def _copy_query(self, qi):
+        if qi is None:
+            return None
+        from .query import QueryIndex
+        out = QueryIndex.__new__(QueryIndex)
+        out.cat = self.new
+        out.vibe_tags = list(qi.vibe_tags)
+        out.by_tag = {t: copy_array(v, "q") for t, v in qi.by_tag.items()}
+        out.by_tone = {t: copy_array(v, "q") for t, v in qi.by_tone.items()}
+        out.price_keys = copy_array(qi.price_keys, "q")
+        out.price_rows = copy_array(qi.price_rows, "q")
+        return out
+
+    def _index_keys(self, i):
+        """第 i 行当前在 new 里的索引键：(元素, 排序分组, vibe 标签, tone, 价格分 / None)。"""
+        cols = self.new.columns
+        elem = cols["element"][i] if self.ei is not None else ""
+        vibe = cols.get("vibe")
+        tone = cols.get("tone")
+        price = cols.get("price")
+        tags = ()
+        if self.query is not None and vibe is not None:
+            vt = self.query.vibe_tags
+            for v in vibe.vocab[len(vt):]:          # 新出现的 vibe 文本：补拆标签
+                vt.append(frozenset(t.strip() for t in v.split("|") if t.strip()))
+            tags = vt[vibe.codes[i]]
+        return (elem, (elem, vibe[i] if vibe is not None else ""), tags,
+                tone[i] if tone is not None else None,
+                price.cents[i] if price is not None and price.decimals[i] >= 0 else None)
+
+    def _unindex(self, i, keys):
+        elem, group, tags, tone, cents = keys
+        _remove(self.new.by_element, elem, i)
+        if self.groups is not None:
+            _remove(self.groups, group, i)
+        if self.query is not None:
+            for t in tags:
+                _remove(self.query.by_tag, t, i)
+            if tone is not None:
+                _remove(self.query.by_tone, tone, i)
+            if cents is not None:
+                _price_remove(self.query.price_keys, self.query.price_rows, cents, i)
+
+    def _index(self, i, keys):
+        elem, group, tags, tone, cents = keys
+        _insert(self.new.by_element, elem, i)
+        if self.groups is not None:
+            _insert(self.groups, group, i)
+        if self.query is not None:
+            for t in tags:
+                _insert(self.query.by_tag, t, i)
+            if tone is not None:
+                _insert(self.query.by_tone, tone, i)
+            if cents is not None:
+                _price_insert(self.query.price_keys, self.query.price_rows, cents, i)
+
+    def update(self, i, values):
+        self._unindex(i, self._index_keys(i))
+        for col, v in zip(self.cols, values):
+            _set(col, i, v)
+        self._index(i, self._index_keys(i))
+
+    def append(self, values):
+        i = self.new._n
+        for col, v in zip(self.cols, values):
+            col.append(v)
+        self.new._n += 1
+        self._index(i, self._index_keys(i))
+
+    def splice(self, removed, inserted):
+        """
+        删掉 removed（old 行号，升序），并在新位置插入 inserted（(新行号, 值)，按新行号升序）：
+        列存储按保留的连续段重新拼接，各索引里保留行的行号按映射一次平移，再登记插入的行。
+        """
+        new, n_old = self.new, self.new._n
+        fallback = new._fallback
+        for i in removed:
+            self._unindex(i, self._index_keys(i))
+            j = bisect_left(fallback, i)
+            if j < len(fallback) and fallback[j] == i:
+                del fallback[j]
+        pieces, newpos = _pieces(n_old, removed, inserted)
+        for fi, col in enumerate(self.cols):
+            if isinstance(col, CodedColumn):
+                for _, values in inserted:          # 先登记新词（可能放宽编号列），再按段拼接
+                    col.code_of(values[fi])
+                codes = array(col.typecode)
+                for p in pieces:
+                    if isinstance(p, range):
+                        codes.extend(col.codes[p.start:p.stop])
+                    else:
+                        codes.append(col.code_of(p[fi]))
+                col.codes = codes
+            elif isinstance(col, PriceColumn):
+                out = PriceColumn(array("q"), array("b"),
+                                  {newpos[i]: v for i, v in col.raw.items() if newpos[i] >= 0})
+                for p in pieces:
+                    if isinstance(p, range):
+                        out.cents.extend(col.cents[p.start:p.stop])
+                        out.decimals.extend(col.decimals[p.start:p.stop])
+                    else:
+                        out.append(p[fi])
+                col.cents, col.decimals, col.raw = out.cents, out.decimals, out.raw
+            else:
+                out = []
+                for p in pieces:
+                    if isinstance(p, range):
+                        out.extend(col[p.start:p.stop])
+                    else:
+                        out.append(p[fi])
+                col[:] = out
+        new._n = len(newpos) - len(removed) + len(inserted)
+        lo = min(removed[0] if removed else n_old, inserted[0][0] if inserted else n_old)
+        indexes = [new.by_element]
+        if self.groups is not None:
+            indexes.append(self.groups)
+        if self.query is not None:
+            indexes += [self.query.by_tag, self.query.by_tone]
+            self.query.price_rows = array("q", map(newpos.__getitem__, self.query.price_rows))
+        for index in indexes:
+            for idx in index.values():
+                _remap(idx, newpos, lo)
+        _remap(fallback, newpos, lo)
+        for i, _ in inserted:
+            self._index(i, self._index_keys(i))
+
+    def fix_fallback(self, hashes, touched):
+        """
+        补位序 = 按内容去重后的首行。只有内容 hash 落在 touched 里的行会变：
+        对这些行按行号重新判定“是否为该内容的首行”，再增删补位序。
+        """
+        rows = {}
+        for i, h in enumerate(hashes):
+            if h in touched:
+                rows.setdefault(h, []).append(i)
+        fallback, values = self.new._fallback, self.new._values
+        for group in rows.values():
+            seen = []
+            for i in group:
+                v = values(i)
+                j = bisect_left(fallback, i)
+                present = j < len(fallback) and fallback[j] == i
+                if v in seen:
+                    if present:
+                        del fallback[j]
+                else:
+                    seen.append(v)
+                    if not present:
+                        fallback.insert(j, i)
+
+    def finish(self, hashes):
+        new = self.new
+        new._row_hashes = hashes
+        if self.query is not None:
+            new._query_index = self.query
+        if self.groups is not None:
+            new._rank_groups = self.groups
+        return new
+
+
+# ---------- diff + 重载 ----------
+def _diff(old, path):
+    """
+    流式读新文件，按 sku 与 old 逐行对齐，只留下变动 / 插入的行。
+    对齐是贪心的：新行的 sku 与下一个未对齐的旧行相同就配上；否则在后面找同 sku 的旧行，
+    跳过的旧行算删除；都找不到（或要跳过的太多）就算插入。
+    能增量时返回 (新行 hash, {old 行号: 新值}, 删掉的 old 行号, [(新行号, 值)])，否则返回 None。
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        fields, rows = csv_rows(f)
+        if fields != old.fields or "sku" not in fields:
+            return None
+        si = fields.index("sku")
+        before, skus = row_hashes(old), old.columns["sku"]
+        n_old = len(old)
+        budget = max(1, n_old) * MAX_INCREMENTAL
+        hashes, changed, removed, inserted = array("q"), {}, [], []
+        where = None                            # sku → 首次出现的 old 行号；第一次对不上时才建
+        j = 0                                   # 下一个还没对齐的旧行
+        for i, values in enumerate(rows):
+            h = hash(values)
+            hashes.append(h)
+            if j < n_old and h == before[j]:
+                j += 1
+                continue
+            sku = values[si]
+            p = j if j < n_old and sku == skus[j] else None
+            if p is None:
+                room = budget - len(changed) - len(removed) - len(inserted)     # 还能跳过几行旧行
+                if where is None:
+                    back = range(n_old - 1, j - 1, -1)
+                    where = dict(zip(map(skus.__getitem__, back), back))
+                p = where.get(sku)
+                if p is not None and p < j:     # 重复 sku：首个已对齐，在剩余预算内往后找
+                    p = next((t for t in range(j, min(n_old, j + int(room))) if skus[t] == sku), None)
+                if p is not None and p - j < room:
+                    removed.extend(range(j, p))
+                else:
+                    p = None
+            if p is None:
+                inserted.append((i, values))
+            else:
+                if h != before[p]:
+                    changed[p] = values
+                j = p + 1
+            if len(changed) + len(removed) + len(inserted) > budget:
+                return None
+    removed.extend(range(j, n_old))             # 末尾删掉的行
+    if len(changed) + len(removed) + len(inserted) > budget:
+        return None
+    return hashes, changed, removed, inserted
+
+
+def _sku_diff(old, new):
+    """按 sku 统计的新增 / 删除数（整体重建时的报告用）。"""
+    before = set(old.columns["sku"]) if "sku" in old.columns else set()
+    after = set(new.columns["sku"]) if "sku" in new.columns else set()
+    return len(after - before), len(before - after)
+
+
+def reload_catalog(old, path):
+    """
+    读取 path 的新内容，返回 (新目录, 报告)。old 不会被修改。
+    报告：{"mode": "incremental" | "full" | "unchanged", "added", "changed", "removed"}
+    """
+    diff = _diff(old, path)
+    if diff is None:
+        new = StyleCatalog.from_csv(path)
+        added, removed = _sku_diff(old, new)
+        return new, {"mode": "full", "added": added, "changed": None, "removed": removed}
+    hashes, changed, removed, inserted = diff
+    report = {"mode": "incremental", "added": len(inserted), "changed": len(changed),
+              "removed": len(removed)}
+    if not changed and not removed and not inserted:
+        report["mode"] = "unchanged"
+        return old, report
+    before = row_hashes(old)
+    patch = _Patch(old)
+    for i, values in changed.items():
+        patch.update(i, values)
+    if not removed and (not inserted or inserted[0][0] >= len(old)):
+        for _, values in inserted:              # 只在末尾追加：保留行的行号不变
+            patch.append(values)
+    else:
+        patch.splice(removed, inserted)
+    touched = {before[i] for i in changed}
+    touched.update(before[i] for i in removed)
+    touched.update(hash(values) for values in changed.values())
+    touched.update(hashes[i] for i, _ in inserted)
+    patch.fix_fallback(hashes, touched)
+    return patch.finish(hashes), report
+
+
+def _signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class CatalogManager:
+    """
+    一个 CSV 文件对应的“当前目录”：
+    - catalog / get()：当前版本，只读引用、从不触发重载
+      （替换是一次赋值，读者不会看到改到一半的目录）
+    - refresh()：stat 一次文件，变了就增量重载后替换（在调用线程上执行，大目录可能要几秒）
+    - watch(interval)：后台守护线程定期 refresh()；常驻服务用它，请求路径上不做任何重载
+    计数：reloads（其中 incremental / full）与累计的 added / changed / removed 行数。
+    """
+
+    def __init__(self, path="data/styles.csv", catalog=None):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._sig = _signature(self.path)
+        self.catalog = catalog if catalog is not None else _load_fresh(self.path)
+        self._stop = None
+        self.stats = {"reloads": 0, "incremental": 0, "full": 0,
+                      "added": 0, "changed": 0, "removed": 0, "errors": 0, "last": None}
+
+    def get(self):
+        return self.catalog
+
+    def refresh(self):
+        """文件有变化就重载；返回当前目录。解析失败（如写到一半、字段超长）时保留旧目录，下次再试。"""
+        try:
+            sig = _signature(self.path)
+        except OSError:
+            return self.catalog
+        if sig == self._sig:
+            return self.catalog
+        with self._lock:
+            if sig == self._sig:
+                return self.catalog
+            try:
+                new, report = reload_catalog(self.catalog, self.path)
+            except (OSError, UnicodeDecodeError, ValueError, csv.Error):
+                self.stats["errors"] += 1
+                return self.catalog
+            self._sig = sig
+            if report["mode"] != "unchanged":
+                self.catalog = new
+                st = self.stats
+                st["reloads"] += 1
+                st[report["mode"]] += 1
+                for k in ("added", "changed", "removed"):
+                    st[k] += report[k] or 0
+            self.stats["last"] = report
+            return self.catalog
+
+    def watch(self, interval=1.0):
+        """启动后台检查线程（守护线程，随进程退出）；返回线程对象。"""
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if self._stop is not None:
+            raise RuntimeError("already watching")
+        self._stop = stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception:       # 任何一版坏文件都不能让检查线程退出：记一次错误，下轮再试
+                    self.stats["errors"] += 1
+        thread = threading.Thread(target=loop, name="catalog-watch", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
@@ -0,0 +1,338 @@
+# fortune/render.py —— 预编译的 Markdown / JSON 渲染（批量输出用）
+# 输出与各入口原来的实现逐字节一致：
+#   QuizMarkdown  ↔ quiz_cli.render_md
+#   DemoMarkdown  ↔ run_demo.render_markdown
+#   AppMarkdown   ↔ app.render_markdown
+#   dumps         ↔ json.dumps(obj, ensure_ascii=False[, indent=2])（StyleRow 列表可在任意深度）
+# 做法：
+#   - 文案模板（MSG / MESSAGES）按语言只编译一次：固定行预先拼好，
+#     带字段的行拆成字面量片段，渲染时直接拼接，不再逐次解析 format 字符串；
+#   - 款式行（“1. **名字** £价格 — 文案 _(element: …)_”）按 (目录版本, 语言, 行号, 序号)
+#     缓存，同一个 SKU 只格式化一次；目录换了缓存自动作废；
+#   - 整篇输出只在最后 "\n".join 一次；
+#   - 年度展望（render_outlook）里主导元素相同的月份共用同一段款式行。
+import json
+import re
+from string import Formatter
+
+MAX_CACHED_LINES = 200_000          # 超出就整体清空（按目录版本分代，清空只是重新预热）
+
+
+def compile_template(template, *names):
+    """
+    "Month {ym} leans **{elem}**." → f(ym, elem)，等价于 template.format(ym=..., elem=...)
+    （参数须为 str）。带格式说明 / 转换符的模板原样退回 str.format。
+    """
+    lits, order, buf = [], [], ""
+    for literal, field, spec, conv in Formatter().parse(template):
+        buf += literal
+        if field is None:
+            continue
+        if spec or conv or field not in names:
+            return lambda *values: template.format(**dict(zip(names, values)))
+        lits.append(buf)
+        order.append(names.index(field))
+        buf = ""
+    lits.append(buf)
+    if not order:
+        return lambda *values: buf
+    if order == [0]:
+        a, b = lits
+        return lambda x, *rest: a + x + b
+    if order == [0, 1]:
+        a, b, c = lits
+        return lambda x, y, *rest: a + x + b + y + c
+
+    def render(*values):
+        out = [lits[0]]
+        for j, k in enumerate(order, 1):
+            out.append(values[k])
+            out.append(lits[j])
+        return "".join(out)
+    return render
+
+
+def _literal(text):
+    """把文案当字面量拼进模板（转义花括号）。"""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class LineCache:
+    """
+    款式行缓存：build(row, variant, i) → 完整的一行（含序号）。
+    只缓存 StyleRow（有目录版本和行号）；普通 dict 每次现算。
+    """
+
+    def __init__(self, build, maxsize=MAX_CACHED_LINES):
+        self.build = build
+        self.maxsize = maxsize
+        self._lines = {}
+        self._version = None
+        self.hits = self.misses = 0
+
+    def line(self, row, variant, i):
+        cat = getattr(row, "_cat", None)
+        if cat is None:
+            return self.build(row, variant, i)
+        version = cat.version
+        if version != self._version or len(self._lines) >= self.maxsize:
+            self._lines = {}
+            self._version = version
+        key = (version, variant, row._i, i)
+        text = self._lines.get(key)
+        if text is None:
+            self.misses += 1
+            text = self._lines[key] = self.build(row, variant, i)
+        else:
+            self.hits += 1
+        return text
+
+    def lines(self, picks, variant):
+        return [self.line(s, variant, i) for i, s in enumerate(picks, 1)]
+
+
+class _Compiled:
+    """某一种语言编译好的片段（属性名即用途）。"""
+
+    def __init__(self, **parts):
+        self.__dict__.update(parts)
+
+
+class QuizMarkdown:
+    """quiz_cli.render_md 的预编译版本。"""
+
+    def __init__(self, messages, default="en"):
+        self.messages = messages
+        self.default = default
+        self._langs = {lang: self._compile(m) for lang, m in messages.items()}
+        self.rows = LineCache(self._row)
+
+    @staticmethod
+    def _compile(m):
+        return _Compiled(
+            head="**Chatbot:** " + m["result_title"],
+            month=compile_template("- " + m["month_elem"], "e"),
+            goal=compile_template("- " + m["goal_line"], "g", "fav"),
+            picks="**Chatbot:** " + m["picks_title"],
+            tail="**Chatbot:** " + m["cta"] + "\n**Chatbot:** " + m["closing"],
+        )
+
+    @staticmethod
+    def _row(s, variant, i):
+        price_val = s.get("price") or ""
+        price = f" £{price_val}" if str(price_val).strip() else ""
+        return (f"{i}. **{s.get('name') or 'Unknown'}**{price} — {s.get('copy') or ''}"
+                f" _(element: {s.get('element') or ''})_")
+
+    def render(self, lang, name, ym, month_elem_str, goal, favored, picks):
+        t = self._langs.get(lang) or self._langs[self.default]
+        out = [t.head, t.month(str(month_elem_str)),
+               t.goal(str(goal), ", ".join([str(x) for x in favored])), t.picks]
+        out += self.rows.lines(picks, None)         # 行文本与语言无关
+        out.append(t.tail)
+        return "\n".join(out)
+
+    def render_outlook(self, lang, name, goal, months):
+        """
+        年度展望（fortune/outlook.py）：一份报告，每月一节（### YYYY-MM + 月元素 + 目标 + 款式）。
+        months 为 OutlookMonth；共享同一份 picks 的月份复用同一段款式行。
+        """
+        t = self._langs.get(lang) or self._langs[self.default]
+        out, blocks = [t.head], {}
+        for m in months:
+            rows = blocks.get(id(m.picks))
+            if rows is None:
+                rows = blocks[id(m.picks)] = self.rows.lines(m.picks, None)
+            out += ["", f"### {m.ym}", t.month(str(m.month_elem)),
+                    t.goal(str(goal), ", ".join([str(x) for x in m.favored])), t.picks]
+            out += rows
+        out += ["", t.tail]
+        return "\n".join(out)
+
+
+class DemoMarkdown:
+    """run_demo.render_markdown 的预编译版本（lang 不是 "en" 时用 cn）。"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self._langs = {lang: self._compile(m) for lang, m in messages.items()}
+        self.rows = LineCache(self._row)
+
+    @staticmethod
+    def _compile(m):
+        return _Compiled(
+            opening=compile_template("**Chatbot:** " + m["opening"], "name"),
+            intro="**Chatbot:** " + m["fortune_intro"],
+            picks="**Chatbot:** " + m["picks_intro"],
+            tail="**Chatbot:** " + m["cta"] + "\n**Chatbot:** " + m["closing"],
+        )
+
+    @staticmethod
+    def _row(s, variant, i):
+        price = f" £{s['price']}" if s.get("price") else ""
+        return f"{i}. **{s['name']}**{price} — {s['copy']} _(element: {s['element']})_"
+
+    def render(self, lang, name, target_month, notes, picks):
+        t = self._langs["cn" if lang != "en" else "en"]
+        out = [t.opening(f"{name}"), t.intro]
+        out += ["- " + n for n in notes]
+        out.append(t.picks)
+        out += self.rows.lines(picks, None)
+        out.append(t.tail)
+        return "\n".join(out)
+
+    def render_outlook(self, lang, name, sections):
+        """
+        年度展望：开场白一次，之后每月一节（### YYYY-MM + 要点 + 款式），结尾一次。
+        sections 为 (月份, 要点列表, 款式) 序列；同一份 picks 的款式行只拼一次。
+        """
+        t = self._langs["cn" if lang != "en" else "en"]
+        out, blocks = [t.opening(f"{name}"), t.intro], {}
+        for ym, notes, picks in sections:
+            rows = blocks.get(id(picks))
+            if rows is None:
+                rows = blocks[id(picks)] = self.rows.lines(picks, None)
+            out += ["", f"### {ym}"]
+            out += ["- " + n for n in notes]
+            out.append(t.picks)
+            out += rows
+        out += ["", t.tail]
+        return "\n".join(out)
+
+
+class AppMarkdown:
+    """app.render_markdown 的预编译版本；款式行含“推荐理由”，按语言分别缓存。"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self._langs = {lang: self._compile(m) for lang, m in messages.items()}
+        self.rows = LineCache(self._row)
+
+    @staticmethod
+    def _compile(m):
+        return _Compiled(
+            title="# " + m["title"],
+            summary="\n## " + m["summary_title"],
+            month=compile_template("- " + m["month_energy"], "ym", "elem"),
+            goal=compile_template("- " + m["goal_energy"], "goal", "fav"),
+            meihua=compile_template("- " + m["meihua_energy"], "extra"),
+            score=compile_template("\n**" + _literal(m["score"]) + ": {score}/100**\n\n## "
+                                   + _literal(m["suggestions"]), "score"),
+            picks="\n## " + m["picks_title"],
+            footer="\n_" + m["footer"] + "_",
+            reason=m["reason"],
+        )
+
+    def _row(self, s, lang, i):
+        price = f" £{s['price']}" if s.get("price") else ""
+        return (f"{i}. **{s.get('name','')}**{price} — {s.get('copy','')}"
+                f" _({self._langs[lang].reason}: {s.get('element','')})_")
+
+    def render(self, lang, name, ym, month_elem_str, goal, favored, extra_elem, score, tips, picks):
+        t = self._langs[lang]
+        out = [t.title, f"**{name}** · {ym}", t.summary,
+               t.month(f"{ym}", f"{month_elem_str}"), t.goal(f"{goal}", ", ".join(favored))]
+        if extra_elem:
+            out.append(t.meihua(f"{extra_elem}"))
+        out.append(t.score(f"{score}"))
+        out += [f"{i}. {tip}" for i, tip in enumerate(tips, 1)]
+        out.append(t.picks)
+        out += self.rows.lines(picks, lang)
+        out.append(t.footer)
+        return "\n".join(out)
+
+
+# ---------- JSON ----------
+class RowJSON:
+    """StyleRow → JSON 文本（紧凑 / indent 缩进两种），按 (目录版本, 行号) 缓存。"""
+
+    def __init__(self, maxsize=MAX_CACHED_LINES):
+        self.maxsize = maxsize
+        self._cache = {}
+        self._version = None
+
+    def get(self, row, indent):
+        cat = getattr(row, "_cat", None)
+        if cat is None:
+            return json.dumps(dict(row), ensure_ascii=False, indent=indent)
+        version = cat.version
+        if version != self._version or len(self._cache) >= self.maxsize:
+            self._cache = {}
+            self._version = version
+        key = (version, row._i, indent)
+        text = self._cache.get(key)
+        if text is None:
+            text = self._cache[key] = json.dumps(dict(row), ensure_ascii=False, indent=indent)
+        return text
+
+
+_ROW_JSON = RowJSON()
+
+
+def _is_rows(value):
+    return (isinstance(value, (list, tuple)) and value and hasattr(value[0], "_cat")
+            and all(hasattr(v, "_cat") for v in value))
+
+
+def _rows_text(rows, indent, depth):
+    """款式行列表在第 depth 层的 JSON 文本（与 json.dumps 的缩进规则一致）。"""
+    if indent is None:
+        return "[" + ", ".join([_ROW_JSON.get(r, None) for r in rows]) + "]"
+    pad = "\n" + " " * (indent * depth)
+    inner = pad + " " * indent
+    return "[" + inner + ("," + inner).join(
+        [_ROW_JSON.get(r, indent).replace("\n", inner) for r in rows]) + pad + "]"
+
+
+_MARK = "\x00rows{}\x00"           # 占位串：json 会把 \x00 转义成 \u0000，正常文本里不会出现
+_MARK_RE = re.compile(r'"\\u0000rows(\d+)\\u0000"')
+_CONTAINERS = (dict, list, tuple)
+
+
+def _swap(value, rows, depth):
+    """把任意深度的 StyleRow 列表换成占位串；只复制含有款式行的容器。"""
+    if _is_rows(value):
+        rows.append((value, depth))
+        return _MARK.format(len(rows) - 1)
+    if not isinstance(value, _CONTAINERS):
+        return value
+    items = value.items() if isinstance(value, dict) else enumerate(value)
+    out = value
+    for k, v in items:
+        if isinstance(v, _CONTAINERS) and v:
+            w = _swap(v, rows, depth + 1)
+            if w is not v:
+                if out is value:
+                    out = dict(value) if isinstance(value, dict) else list(value)
+                out[k] = w
+    return out
+
+
+def _plain(value):
+    if _is_rows(value):
+        return [dict(r) for r in value]
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def dumps(obj, indent=None):
+    """
+    与 json.dumps(obj, ensure_ascii=False, indent=indent) 逐字节一致的序列化。
+    值为 StyleRow 列表时（如 "picks"，或年度展望里 months[*].picks）先放占位串整体编码一次，
+    再一趟把占位串换成缓存好的行 JSON，省掉逐行 dict() 转换与重复编码。
+    """
+    rows = []
+    text = json.dumps(_swap(obj, rows, 0), ensure_ascii=False, indent=indent)
+    if not rows:
+        return text
+    found = [int(i) for i in _MARK_RE.findall(text)]
+    if found != list(range(len(rows))):     # 占位串撞上了真实内容：老老实实整体编码
+        return json.dumps(_plain(obj), ensure_ascii=False, indent=indent)
+
+    def splice(m):
+        value, depth = rows[int(m.group(1))]
+        return _rows_text(value, indent, depth)
+    return _MARK_RE.sub(splice, text)
@@ -0,0 +1,156 @@
+# fortune/rules.py —— 极简规则：月份元素、目标偏好、梅花尾数、评分与建议
+# 可替换为八字/梅花专业算法；三个入口脚本（app / quiz_cli / run_demo）共用这里的规则。
+# 只用内建类型，导入几乎不花时间：CLI 的启动预算见 bench/importtime_budget.py。
+
+MONTH_TO_ELEMENT = {
+    "1":"earth","2":"wood","3":"wood","4":"earth","5":"fire","6":"fire",
+    "7":"earth","8":"metal","9":"metal","10":"earth","11":"water","12":"water"
+}
+GOAL_BIAS = {
+    "career": ["fire","metal"],
+    "wealth": ["metal","earth"],
+    "health": ["water","wood"],
+    "emotion": ["water","earth"],
+    "love":   ["wood","water"],
+    "study":  ["wood","fire"],
+    "social": ["earth","metal"],
+}
+MEIHUA_LASTDIGIT_TO_ELEMENT = {0:"water",1:"metal",2:"metal",3:"fire",4:"wood",5:"wood",6:"water",7:"earth",8:"earth",9:"metal"}
+
+GOALS = tuple(GOAL_BIAS)
+DEFAULT_BIAS = ("fire", "metal")        # 未知目标的偏好
+
+# ---- 编译后的查找结构：导入时建一次 ----
+_MONTH_ELEM = {int(k): v for k, v in MONTH_TO_ELEMENT.items()}
+_GOAL_BASE = {g: tuple(v) for g, v in GOAL_BIAS.items()}
+_ELEMENTS = frozenset(MONTH_TO_ELEMENT.values()) | frozenset(MEIHUA_LASTDIGIT_TO_ELEMENT.values())
+_FAVORED = {}       # (goal, month_elem, extra) → tuple；只缓存规则空间内的组合，大小有界
+
+def parse_month(ym):
+    """"2025-09" / "2025/9" / "9" → 9；无法解析返回 None（不检查范围）。"""
+    try:
+        token = str(ym).strip()
+        if "-" in token:
+            return int(token.split("-")[-1])
+        if "/" in token:
+            return int(token.split("/")[-1])
+        return int(token)
+    except Exception:
+        return None
+
+def month_element(ym) -> str:
+    """目标月份的主导元素；无法解析或越界时为 earth。"""
+    return _MONTH_ELEM.get(parse_month(ym), "earth")
+
+def favored_elements(goal, month_elem_str, extra_elem=None):
+    """[梅花元素] + 目标偏好 + 月份元素，去重保序；全空时为 ["earth"]。"""
+    key = (goal, month_elem_str, extra_elem)
+    hit = _FAVORED.get(key)
+    if hit is None:
+        seq = list(_GOAL_BASE.get(goal, DEFAULT_BIAS)) + [month_elem_str]
+        if extra_elem:
+            seq = [extra_elem] + seq
+        out, seen = [], set()
+        for e in seq:
+            e = "" if e is None else str(e)
+            if e and e not in seen:
+                out.append(e); seen.add(e)
+        hit = tuple(out or ["earth"])
+        if goal in _GOAL_BASE and month_elem_str in _ELEMENTS \
+                and (extra_elem is None or extra_elem in _ELEMENTS):
+            _FAVORED[key] = hit
+    return list(hit)
+
+def meihua_digit(nums):
+    """梅花：最后一个数的末位数字；没有或无法解析时为 None。"""
+    try:
+        if not nums: return None
+        return int(str(nums[-1])[-1])
+    except Exception:
+        return None
+
+def meihua_elem_from_nums(nums):
+    d = meihua_digit(nums)
+    return None if d is None else MEIHUA_LASTDIGIT_TO_ELEMENT.get(d, "earth")
+
+meihua_element_from_nums = meihua_elem_from_nums        # quiz_cli 的旧名
+
+# ====== 评分与建议 ======
+def compute_score(goal, month_elem_str, extra_elem, picks, favored):
+    """
+    简单可解释的打分：
+    - 基准 60
+    - 月元素命中目标偏好 +10
+    - 梅花元素命中目标偏好 +10
+    - 推荐产品中，元素落在 favored 的占比（最多 +20）
+    - 封顶/保底：[30,100]
+    """
+    score = 60
+    if month_elem_str in favored: score += 10
+    if extra_elem and (extra_elem in favored): score += 10
+    if picks:
+        hit = sum(1 for p in picks if (p.get("element") or "") in favored)
+        score += int(20 * (hit / max(1,len(picks))))
+    score = max(30, min(100, score))
+    return score
+
+# 元素 → 行动语义（非常简化，可自行调整）
+ELEM_TIPS = {
+    "en": {
+        "wood":  "Set one growth target; ship small daily progress.",
+        "fire":  "Increase visibility: share a weekly highlight.",
+        "earth": "Stabilize routines; batch tasks every morning.",
+        "metal": "Declutter and set sharp priorities; say no twice.",
+        "water": "Protect recovery windows; hydrate and walk 20 min.",
+    },
+    "cn": {
+        "wood":  "设一个成长目标；每天小步前进并记录。",
+        "fire":  "提高曝光度：每周公开一次成果。",
+        "earth": "稳住作息；每天上午批量处理琐事。",
+        "metal": "做减法与聚焦；本周学会拒绝两次。",
+        "water": "保护修复窗口；多喝水并坚持 20 分钟步行。",
+    },
+}
+GOAL_TIPS = {
+    "en": {
+        "career":"Book a feedback chat; keep a weekly demo log.",
+        "wealth":"Audit expenses; raise price or add upsell.",
+        "health":"Schedule 3 workouts; track sleep 7 nights.",
+        "emotion":"Journal 5 minutes nightly; name one feeling.",
+        "love":"Plan one no-phone date; send one kind note.",
+        "study":"Use 25-min focus blocks; review notes on Sunday.",
+        "social":"Reach out to 2 old contacts; host a small meetup.",
+    },
+    "cn": {
+        "career":"约一次反馈谈话；每周记录一次成果演示。",
+        "wealth":"盘点支出；尝试提价或增加加购。",
+        "health":"排好 3 次运动；连续 7 晚记录睡眠。",
+        "emotion":"每晚写 5 分钟日记；说出一种情绪。",
+        "love":"安排一次不看手机的约会；发一条暖心消息。",
+        "study":"用 25 分钟专注块；周日复盘笔记。",
+        "social":"联系 2 位老朋友；组织一次小聚。",
+    },
+}
+HABIT_TIP = {
+    "en": "Wear your {elem} set on key days as a cue to stay on track.",
+    "cn": "在关键日子佩戴 {elem} 元素款，作为坚持的提醒。",
+}
+
+def suggestion_keys(goal, month_elem_str, favored):
+    """三条建议的“键”：(月份元素, 目标, 主导元素)。与语言无关，可预先算好。"""
+    elem = month_elem_str if month_elem_str in ELEM_TIPS["en"] else "earth"
+    goal = goal if goal in GOAL_TIPS["en"] else "career"
+    lead = favored[0] if favored else month_elem_str
+    return (elem, goal, lead)
+
+def suggestions_from_keys(lang, keys):
+    lang = "cn" if lang == "cn" else "en"
+    elem, goal, lead = keys
+    return [ELEM_TIPS[lang][elem], GOAL_TIPS[lang][goal], HABIT_TIP[lang].format(elem=lead)]
+
+def make_suggestions(lang, goal, month_elem_str, favored):
+    """
+    生成三条可执行建议：1条“月份元素型”，1条“目标领域型”，1条“习惯执行型”
+    文案足够短，方便放在卡片里。
+    """
+    return suggestions_from_keys(lang, suggestion_keys(goal, month_elem_str, favored))
@@ -0,0 +1,245 @@
+# fortune/server.py —— asyncio HTTP 推荐服务（0 依赖，只用标准库）
+# 用法：python -m fortune.server --port 8080 [--catalog data/styles.csv]
+#
+#   GET  /health                      → {"ok": true, "styles": N, "version": 目录版本}
+#   GET  /reading?target_month=2025-09&goal=wealth&nums=2,9,8&lang=en
+#   POST /reading   {"target_month": "2025-09", "goal": "wealth", "nums": [2,9,8], ...}
+#   POST /readings  {"requests": [{...}, {...}]}  或直接一个 JSON 数组（批量）
+#
+# 单进程内目录只加载一次；styles.csv 改动后由后台线程按行增量热重载（fortune/reload.py），无需重启。
+# 每个请求（含整批）开始时取一次当前目录，处理过程中目录被替换也不受影响。
+# HTTP/1.1 keep-alive，同一连接上的流水线请求按序应答。
+import argparse
+import asyncio
+import json
+from urllib.parse import parse_qs, urlsplit
+
+from .answers import lookup_answer
+from .reload import CatalogManager
+from .query import has_constraints, parse_price, parse_tags, pick_constrained
+from .rules import compute_score, suggestions_from_keys
+
+MAX_BODY = 8 * 1024 * 1024
+MAX_BATCH = 10_000
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _nums(value):
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        return [x.strip() for x in value.replace("，", ",").split(",") if x.strip()]
+    if isinstance(value, list):
+        return value
+    raise BadRequest("nums must be a list or a comma-separated string")
+
+
+def _tags(value):
+    try:
+        return parse_tags(value)
+    except ValueError as e:
+        raise BadRequest(str(e)) from None
+
+
+def _price(value):
+    try:
+        return parse_price(value)
+    except ValueError as e:
+        raise BadRequest(str(e)) from None
+
+
+def make_reading(req, catalog):
+    """
+    一条解读：month_element → favored_elements → pick_styles → compute_score → make_suggestions。
+    默认走预编译答案表；带个性化条件时只重算选款与评分。
+    """
+    if not isinstance(req, dict):
+        raise BadRequest("each request must be a JSON object")
+    ym = str(req.get("target_month") or "")
+    if not ym:
+        raise BadRequest("target_month is required")
+    goal = str(req.get("goal") or "career")
+    lang = "cn" if req.get("lang") == "cn" else "en"
+    ans = lookup_answer(catalog, ym, goal, _nums(req.get("nums")))
+    picks, score = ans.picks, ans.score
+    constraints = {"vibes": _tags(req.get("vibes")), "tones": _tags(req.get("tones")),
+                   "min_price": _price(req.get("min_price")), "max_price": _price(req.get("max_price"))}
+    if has_constraints(**constraints):
+        picks = pick_constrained(ans.favored, catalog, 3, **constraints)
+        score = compute_score(goal, ans.month_elem, ans.extra_elem, picks, ans.favored)
+    out = {
+        "target_month": ym,
+        "goal": goal,
+        "month_element": ans.month_elem,
+        "meihua_element": ans.extra_elem,
+        "elements_considered": list(ans.favored),
+        "score": score,
+        "suggestions": suggestions_from_keys(lang, ans.tip_keys),
+        "picks": [dict(p) for p in picks],
+    }
+    if "name" in req:
+        out["name"] = req["name"]
+    return out
+
+
+class ReadingService:
+    """
+    与传输无关的路由：(方法, 路径, 查询串, 请求体) → (状态码, 可 JSON 序列化的结果)。
+    catalog 为固定目录；或给 manager（CatalogManager），每个请求只读它的当前版本，
+    重载由 manager 的后台线程完成，不占用事件循环。
+    """
+
+    def __init__(self, catalog=None, manager=None):
+        if (catalog is None) == (manager is None):
+            raise ValueError("give exactly one of catalog / manager")
+        self.manager = manager
+        self._catalog = catalog
+
+    @property
+    def catalog(self):
+        return self.manager.get() if self.manager is not None else self._catalog
+
+    def handle(self, method, path, query, body):
+        catalog = self.catalog
+        if path == "/health":
+            return 200, {"ok": True, "styles": len(catalog), "version": catalog.version}
+        if path == "/reading":
+            if method == "GET":
+                req = {k: v[-1] for k, v in parse_qs(query).items()}
+            elif method == "POST":
+                req = _json(body)
+            else:
+                return 405, {"error": "use GET or POST"}
+            return 200, make_reading(req, catalog)
+        if path == "/readings":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            data = _json(body)
+            reqs = data.get("requests") if isinstance(data, dict) else data
+            if not isinstance(reqs, list):
+                raise BadRequest("expected a JSON array or {\"requests\": [...]}")
+            if len(reqs) > MAX_BATCH:
+                raise BadRequest(f"at most {MAX_BATCH} requests per batch")
+            results = []
+            for r in reqs:                  # 批内单条出错不影响其他条
+                try:
+                    results.append(make_reading(r, catalog))
+                except BadRequest as e:
+                    results.append({"error": str(e)})
+            return 200, {"results": results}
+        return 404, {"error": "not found"}
+
+
+def _json(body):
+    try:
+        return json.loads(body or b"null")
+    except ValueError:
+        raise BadRequest("invalid JSON body") from None
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def _handle_conn(service, reader, writer):
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (asyncio.LimitOverrunError, ValueError):
+                break
+            if not line:
+                break
+            try:
+                method, target, version = line.decode("latin-1").split()
+            except ValueError:
+                writer.write(_response(400, {"error": "bad request line"}, False))
+                break
+            headers = {}
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                k, _, v = h.decode("latin-1").partition(":")
+                headers[k.strip().lower()] = v.strip()
+            conn = headers.get("connection", "").lower()
+            keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                writer.write(_response(400, {"error": "bad Content-Length"}, False))
+                break
+            if length > MAX_BODY:
+                writer.write(_response(413, {"error": "body too large"}, False))
+                break
+            body = await reader.readexactly(length) if length else b""
+            url = urlsplit(target)
+            try:
+                status, payload = service.handle(method, url.path, url.query, body)
+            except BadRequest as e:
+                status, payload = 400, {"error": str(e)}
+            except Exception as e:          # 不让单个请求拖垮连接
+                status, payload = 500, {"error": str(e)}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8080, catalog=None, path="data/styles.csv", reload_interval=1.0):
+    """
+    启动服务并返回 asyncio.Server（port=0 时由系统分配端口，便于本地测试）。
+    不给 catalog 时按 path 加载，并由后台线程每 reload_interval 秒检查一次文件是否改动。
+    """
+    if catalog is not None:
+        service = ReadingService(catalog)
+    else:
+        manager = CatalogManager(path)
+        manager.watch(reload_interval)
+        service = ReadingService(manager=manager)
+    return await asyncio.start_server(
+        lambda r, w: _handle_conn(service, r, w), host, port, limit=MAX_BODY)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="MITAY 解读 HTTP 服务")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--catalog", default="data/styles.csv")
+    ap.add_argument("--reload-interval", type=float, default=1.0,
+                    help="后台检查目录文件改动的间隔（秒）")
+    args = ap.parse_args(argv)
+
+    async def run():
+        server = await serve(args.host, args.port, path=args.catalog,
+                             reload_interval=args.reload_interval)
+        addr = server.sockets[0].getsockname()
+        print(f"✅ listening on http://{addr[0]}:{addr[1]}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
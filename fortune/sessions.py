@@ -0,0 +1,244 @@
+# fortune/sessions.py —— 追加写的分片会话存储
+# 替代 outputs/session_<秒级时间戳>.json/.md：同一秒内的并发会话会互相覆盖，
+# 大量小文件也会拖垮文件系统。这里改为：
+#   - 所有写入进程共用按天、按大小轮转的分片 <YYYYMMDD>-<n>.jsonl，紧凑 JSON 一行一条；
+#     以 O_APPEND 打开，每批写入在分片上加 flock，数据与 .idx 在同一把锁内写完
+#   - 同名 .idx 侧车文件记录 “id \t 偏移 \t 长度”，取单条会话不用扫描分片
+#   - 写入先攒在内存里，每 fsync_every 条（或攒满 buffer_size 字节）整批写出并 fsync
+#     （fsync_every=0 = 不 fsync，攒满或关闭时写出）
+#   - id = <分片名>-<进程标签>-<序号>：进程标签含启动时间、pid 与随机数，天然不冲突；
+#     id 里带着分片名，按 id 取会话只读那一个分片的 .idx
+# 没有 fcntl 的平台（Windows）只有进程内的锁：请只让一个进程写同一个目录。
+# 查看：python -m fortune.sessions get <id> [--md]
+import argparse
+import atexit
+import datetime
+import json
+import os
+import pathlib
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:             # Windows
+    fcntl = None
+
+DEFAULT_ROOT = "outputs/sessions"
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+class SessionStore:
+    def __init__(self, root=DEFAULT_ROOT, max_shard_bytes=64 * 1024 * 1024,
+                 fsync_every=32, buffer_size=64 * 1024):
+        self.root = pathlib.Path(root)
+        self.max_shard_bytes = max_shard_bytes
+        self.fsync_every = fsync_every
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._tag = f"{time.time_ns() // 1_000_000:x}{os.getpid():x}{os.urandom(2).hex()}"
+        self._seq = 0
+        self._shard = None          # 当前分片名（不含 .jsonl）
+        self._fd = self._idx_fd = None
+        self._size = 0              # 当前分片的大小：上次写出时的实际大小 + 本地待写的字节
+        self._pending = []          # 待写出的 (id, 行)：整批写出时才确定偏移
+        self._pending_bytes = 0
+        self._index = {}            # id → (分片文件名, 偏移, 长度)
+        self._idx_seen = {}         # .idx 文件名 → 已读到的字节数
+
+    # ---------- 写 ----------
+    def _pick_shard(self):
+        """今天编号最大的分片；它已满就用下一个编号（各进程算出的是同一个名字）。"""
+        day = datetime.datetime.utcnow().strftime("%Y%m%d")
+        self.root.mkdir(parents=True, exist_ok=True)
+        nums = [int(p.stem.rsplit("-", 1)[1]) for p in self.root.glob(f"{day}-*.jsonl")
+                if p.stem.rsplit("-", 1)[1].isdigit()]
+        n = max(nums, default=1)
+        path = self.root / f"{day}-{n:04d}.jsonl"
+        if path.exists() and path.stat().st_size >= self.max_shard_bytes:
+            n += 1
+        return f"{day}-{n:04d}"
+
+    def _open_shard(self):
+        self._close_shard()
+        self._shard = self._pick_shard()
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        self._fd = os.open(self.root / f"{self._shard}.jsonl", flags, 0o644)
+        self._idx_fd = os.open(self.root / f"{self._shard}.jsonl.idx", flags, 0o644)
+        self._size = os.fstat(self._fd).st_size
+
+    def _close_shard(self):
+        if self._fd is not None:
+            self._sync()
+            os.close(self._fd)
+            os.close(self._idx_fd)
+            self._fd = self._idx_fd = None
+
+    def _sync(self, fsync=True):
+        """整批写出：加锁后取分片当前末尾作为起始偏移，数据与索引一起写完再解锁。"""
+        if not self._pending:
+            return
+        data = b"".join(line for _, line in self._pending)
+        name = f"{self._shard}.jsonl"
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            off = os.fstat(self._fd).st_size
+            _write_all(self._fd, data)
+            idx = []
+            for sid, line in self._pending:
+                idx.append(f"{sid}\t{off}\t{len(line)}\n".encode("ascii"))
+                self._index[sid] = (name, off, len(line))
+                off += len(line)
+            _write_all(self._idx_fd, b"".join(idx))     # 索引永远不超前于数据
+            if fsync and self.fsync_every:
+                os.fsync(self._fd)
+                os.fsync(self._idx_fd)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._size = off
+        self._pending.clear()
+        self._pending_bytes = 0
+
+    def _day_changed(self):
+        return not self._shard.startswith(datetime.datetime.utcnow().strftime("%Y%m%d"))
+
+    def append(self, data, md=None):
+        """写入一条会话，返回 id。data 为可 JSON 序列化的结果，md 为可选的 Markdown。"""
+        with self._lock:
+            if self._fd is None or self._size >= self.max_shard_bytes or self._day_changed():
+                self._open_shard()
+            self._seq += 1
+            sid = f"{self._shard}-{self._tag}-{self._seq}"
+            rec = {"id": sid, "saved_at": datetime.datetime.utcnow().isoformat() + "Z",
+                   "data": data, "md": md}
+            line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+            self._pending.append((sid, line))
+            self._pending_bytes += len(line)
+            self._size += len(line)
+            if self.fsync_every and len(self._pending) >= self.fsync_every:
+                self._sync()
+            elif self._pending_bytes >= self.buffer_size or len(self._pending) >= 1024:
+                self._sync(fsync=False)
+            return sid
+
+    def flush(self):
+        with self._lock:
+            if self._fd is not None:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            self._close_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def path_of(self, sid):
+        parts = sid.split("-")
+        if len(parts) == 4:                     # id 里带着分片名（可能还攒在内存里没写出）
+            return self.root / f"{parts[0]}-{parts[1]}.jsonl"
+        loc = self._locate(sid)
+        return None if loc is None else self.root / loc[0]
+
+    # ---------- 读 ----------
+    def _read_idx(self, p):
+        """增量读取一个 .idx 文件的新尾部（其他进程写的会话）。"""
+        try:
+            size = p.stat().st_size
+        except FileNotFoundError:
+            return
+        done = self._idx_seen.get(p.name, 0)
+        if size <= done:
+            return
+        with open(p, "rb") as f:
+            f.seek(done)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1           # 只吃完整的行
+        shard = p.name[:-len(".idx")]
+        for ln in chunk[:end].splitlines():
+            sid, off, length = ln.decode("ascii").split("\t")
+            self._index[sid] = (shard, int(off), int(length))
+        self._idx_seen[p.name] = done + end
+
+    def _locate(self, sid):
+        loc = self._index.get(sid)
+        if loc is None and self.root.exists():
+            parts = sid.split("-")
+            if len(parts) == 4:                 # <天>-<编号>-<标签>-<序号>：只看所在分片
+                self._read_idx(self.root / f"{parts[0]}-{parts[1]}.jsonl.idx")
+            else:                               # 旧版按进程分片的 id：扫描全部索引
+                for p in self.root.glob("*.jsonl.idx"):
+                    self._read_idx(p)
+            loc = self._index.get(sid)
+        return loc
+
+    def get(self, sid):
+        """按 id 取回整条记录（{"id","saved_at","data","md"}）；不存在时返回 None。"""
+        with self._lock:
+            if any(sid == p for p, _ in self._pending):
+                self._sync(fsync=False)     # 自己还攒在内存里的数据
+            loc = self._locate(sid)
+            if loc is None:
+                return None
+            shard, off, length = loc
+        with open(self.root / shard, "rb") as f:
+            f.seek(off)
+            return json.loads(f.read(length))
+
+    def __iter__(self):
+        """按分片顺序遍历全部会话记录。"""
+        self.flush()
+        for p in sorted(self.root.glob("*.jsonl")):
+            with open(p, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def default_store(root=DEFAULT_ROOT):
+    """进程内共享的存储实例（Streamlit 各会话、各次重跑共用同一个写入者）。"""
+    key = os.path.abspath(root)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = SessionStore(root)
+            atexit.register(store.close)
+        return store
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="查看会话存储")
+    ap.add_argument("--root", default=DEFAULT_ROOT)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    g = sub.add_parser("get")
+    g.add_argument("id")
+    g.add_argument("--md", action="store_true", help="输出 Markdown 而不是 JSON")
+    sub.add_parser("count")
+    args = ap.parse_args(argv)
+
+    store = SessionStore(args.root)
+    if args.cmd == "count":
+        print(sum(1 for _ in store))
+        return
+    rec = store.get(args.id)
+    if rec is None:
+        raise SystemExit(f"session not found: {args.id}")
+    print((rec["md"] or "") if args.md else json.dumps(rec["data"], ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# fortune/snapshot.py —— styles.csv 的二进制快照（mmap 冷启动）
+# 用法：python -m fortune.snapshot data/styles.csv [-o data/styles.snap]
+#
+# 文件布局（本机字节序，所有段按 8 字节对齐）：
+#   MAGIC(8) | 版本 u32 | 头部长度 u32 | 头部 JSON | 各列 / 索引的原始数组
+# 头部记录 CSV 的 size / mtime_ns；不一致即视为过期，加载方回退到 CSV。
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .catalog import CodedColumn, PackedStrings, PriceColumn, StyleCatalog
+
+MAGIC = b"MITAYSNP"
+VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+
+
+def snapshot_path_for(csv_path):
+    root, _ = os.path.splitext(csv_path)
+    return root + ".snap"
+
+
+def _source_sig(csv_path):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class _Writer:
+    def __init__(self):
+        self.chunks = []
+        self.pos = 0
+
+    def add(self, data):
+        """追加一段字节，返回其 (偏移, 长度)；偏移相对数据区起点。"""
+        data = bytes(data)
+        off = self.pos
+        self.chunks.append(data)
+        self.pos += len(data)
+        pad = -self.pos % 8
+        if pad:
+            self.chunks.append(b"\0" * pad)
+            self.pos += pad
+        return [off, len(data)]
+
+
+def build_snapshot(csv_path, out_path=None):
+    """解析 CSV 一次，把列数据与元素索引写成快照文件，返回快照路径。"""
+    out_path = out_path or snapshot_path_for(csv_path)
+    sig = _source_sig(csv_path)
+    cat = StyleCatalog.from_csv(csv_path)
+    w = _Writer()
+    cols = {}
+    for f in cat.fields:
+        col = cat.columns[f]
+        if isinstance(col, CodedColumn):
+            cols[f] = {"kind": "coded", "vocab": col.vocab, "codes": w.add(col.codes),
+                       "typecode": col.typecode}
+        elif isinstance(col, PriceColumn):
+            cols[f] = {"kind": "price", "cents": w.add(col.cents),
+                       "decimals": w.add(col.decimals),
+                       "raw": {str(i): t for i, t in col.raw.items()}}
+        else:
+            offsets, blob = array("q", [0]), bytearray()
+            for v in col:
+                blob += v.encode("utf-8")
+                offsets.append(len(blob))
+            cols[f] = {"kind": "str", "offsets": w.add(offsets), "blob": w.add(blob)}
+    header = {
+        "source": sig, "byteorder": sys.byteorder, "n": len(cat), "fields": cat.fields,
+        "columns": cols,
+        "by_element": {e: w.add(array("q", idx)) for e, idx in cat.by_element.items()},
+        "fallback": w.add(array("q", cat._fallback)),
+    }
+    hdr = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    hdr += b" " * (-(len(hdr) + _PREFIX.size) % 8)
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(hdr)))
+        f.write(hdr)
+        for c in w.chunks:
+            f.write(c)
+    os.replace(tmp, out_path)       # 原子替换：读者不会看到写了一半的快照
+    return out_path
+
+
+def load_snapshot(snap_path, csv_path=None):
+    """
+    mmap 快照并组装 StyleCatalog，不复制列数据；fork 出的子进程共享这些页。
+    版本 / 字节序不符、文件截断或损坏（头部解析失败、任一段越界或长度与行数不符），
+    或 csv_path 给出且与快照记录的 size/mtime 不一致时返回 None。
+    """
+    try:
+        with open(snap_path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        cat = _assemble(mm, csv_path)
+    except (struct.error, ValueError, KeyError, TypeError, AttributeError):
+        cat = None                  # 截断 / 损坏的快照：交给调用方回退解析 CSV
+    if cat is None:
+        try:
+            mm.close()
+        except BufferError:         # 仍有视图引用这块映射：留给垃圾回收
+            pass
+        return None
+    cat._mmap = mm                  # 与目录同生命周期
+    cat._snapshot = os.path.abspath(snap_path)     # 子进程（spawn）据此重新 mmap，见 StyleCatalog.__reduce_ex__
+    return cat
+
+
+def _assemble(mm, csv_path):
+    """校验头部与各段范围并组装目录；任何一段越界或长度与行数不符都返回 None。"""
+    magic, version, hlen = _PREFIX.unpack_from(mm, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+    base = _PREFIX.size + hlen
+    if base > len(mm):
+        return None
+    header = json.loads(bytes(mm[_PREFIX.size:base]))
+    if header["byteorder"] != sys.byteorder:
+        return None
+    if csv_path is not None:
+        try:
+            if header["source"] != _source_sig(csv_path):
+                return None
+        except OSError:
+            pass                    # CSV 不在了：快照就是唯一来源
+
+    buf = memoryview(mm)
+    end = len(mm) - base
+    n = header["n"]
+
+    def view(span, fmt, count=None):
+        off, length = span
+        if off < 0 or length < 0 or off + length > end:
+            raise ValueError("snapshot segment out of range")
+        v = buf[base + off:base + off + length].cast(fmt)
+        if count is not None and len(v) != count:
+            raise ValueError("snapshot segment length mismatch")
+        return v
+
+    columns = {}
+    for f in header["fields"]:
+        spec = header["columns"][f]
+        if spec["kind"] == "coded":
+            typecode = spec.get("typecode", "H")
+            if typecode not in ("H", "I"):
+                raise ValueError("snapshot coded column has a bad typecode")
+            columns[f] = CodedColumn(spec["vocab"], view(spec["codes"], typecode, n))
+        elif spec["kind"] == "price":
+            columns[f] = PriceColumn(view(spec["cents"], "q", n), view(spec["decimals"], "b", n),
+                                     {int(i): t for i, t in spec["raw"].items()})
+        else:
+            offsets = view(spec["offsets"], "q", n + 1)
+            blob = view(spec["blob"], "B")
+            if offsets[n] != len(blob):
+                raise ValueError("snapshot string blob length mismatch")
+            columns[f] = PackedStrings(blob, offsets)
+    by_element = {e: view(span, "q") for e, span in header["by_element"].items()}
+    if sum(len(v) for v in by_element.values()) != n:
+        return None
+    return StyleCatalog.from_columns(header["fields"], columns, n,
+                                     by_element, view(header["fallback"], "q"))
+
+
+def load_snapshot_for(csv_path):
+    """CSV 旁边有新鲜的快照就加载它，否则返回 None。"""
+    snap = snapshot_path_for(csv_path)
+    if not os.path.exists(snap):
+        return None
+    return load_snapshot(snap, csv_path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="把 styles.csv 编译成 mmap 快照")
+    ap.add_argument("csv", nargs="?", default="data/styles.csv")
+    ap.add_argument("-o", "--out", default=None)
+    args = ap.parse_args(argv)
+    out = build_snapshot(args.csv, args.out)
+    print(f"✅ {args.csv} → {out} ({os.path.getsize(out):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# fortune/vectorized.py —— NumPy 批量打分（可选依赖）
+# 与 rules.compute_score 逐条一致（含 [30,100] 截断与 int() 取整），
+# 纯 Python 版本仍是参考实现；这里只负责“一次算很多条”。
+#   - score_catalog：给一个用户的一次解读，把目录里每个 SKU 当作单一推荐打分
+#   - score_codes / score_batch：成批的 (月份元素, 梅花元素, favored, picks) 打分
+from itertools import chain
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError as e:                    # pragma: no cover
+    raise ImportError("fortune.vectorized 需要 numpy：pip install numpy") from e
+
+from .catalog import CodedColumn, StyleCatalog
+
+_CAT, _ROW = attrgetter("_cat"), attrgetter("_i")
+
+
+class ElementCodes:
+    """
+    元素字符串 → 小整数编码。以目录 element 列的词表为起点（与列数据同码），
+    遇到新字符串按需追加，所以任何字符串比较都能精确还原；最多 63 个。
+    """
+
+    def __init__(self, styles=None):
+        vocab = []
+        if styles is not None:
+            col = StyleCatalog.of(styles).columns.get("element")
+            if isinstance(col, CodedColumn):
+                vocab = list(col.vocab)
+        if len(vocab) > 63:
+            raise ValueError("element vocabulary too large for bitmask scoring")
+        self.lookup = {v: i for i, v in enumerate(vocab)}
+
+    def code(self, value):
+        c = self.lookup.get(value)
+        if c is None:
+            c = self.lookup[value] = len(self.lookup)
+            if c >= 63:
+                raise ValueError("element vocabulary too large for bitmask scoring")
+        return c
+
+    def encode(self, values, empty_is_none=False):
+        """None → -1（不命中），其余按词表编码；empty_is_none 时假值（如空串）也记 -1。"""
+        table = dict(self.lookup)
+        table[None] = -1
+        if empty_is_none:
+            table[""] = -1
+        try:                                    # 常见情形：全是已知元素，整段用 dict 查表
+            return np.fromiter(map(table.__getitem__, values), dtype=np.int16, count=len(values))
+        except KeyError:
+            return np.array([-1 if v is None or (empty_is_none and not v) else self.code(v)
+                             for v in values], dtype=np.int16)
+
+    def masks(self, favoreds):
+        """每个 favored 序列 → 位掩码（uint64）。相同的 favored 只算一次，再按反查下标展开。"""
+        keys = list(map(tuple, favoreds))
+        uniq, inverse = _inverse(keys)
+        table = np.zeros(len(uniq), dtype=np.uint64)
+        for j, fav in enumerate(uniq):
+            m = 0
+            for e in fav:
+                m |= 1 << self.code(e)
+            table[j] = m
+        return table[inverse]
+
+
+def _inverse(keys):
+    """keys → (去重后的键（首次出现顺序）, 每个位置在其中的下标)。"""
+    pos = {k: j for j, k in enumerate(dict.fromkeys(keys))}
+    return list(pos), np.fromiter(map(pos.__getitem__, keys), dtype=np.intp, count=len(keys))
+
+
+def _hits(codes, masks):
+    """codes 的元素是否落在对应 masks 中；负码（None / 无推荐）永不命中。"""
+    codes = np.asarray(codes, dtype=np.int64)
+    ok = (codes >= 0) & (codes < 63)
+    bits = np.left_shift(np.uint64(1), np.where(ok, codes, 0).astype(np.uint64))
+    return ok & ((masks & bits) != 0)
+
+
+def score_codes(month_codes, extra_codes, masks, pick_codes):
+    """
+    向量化的 compute_score：
+      month_codes / extra_codes : (N,) 元素编码，extra 为 -1 表示无梅花
+      masks                     : (N,) favored 位掩码
+      pick_codes                : (N, K) 推荐款元素编码；-2 表示该位没有推荐（不计入数量）
+    返回 (N,) int64 分数。
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    pick_codes = np.asarray(pick_codes, dtype=np.int64)
+    if pick_codes.ndim == 1:
+        pick_codes = pick_codes[:, None]
+    score = np.full(masks.shape, 60, dtype=np.int64)
+    score += 10 * _hits(month_codes, masks)
+    score += 10 * _hits(extra_codes, masks)
+    present = pick_codes > -2
+    n = present.sum(axis=1)
+    hit = (present & _hits(pick_codes, masks[:, None])).sum(axis=1)
+    # 与 int(20 * (hit / max(1,len(picks)))) 相同的浮点运算顺序，再向零取整
+    bonus = np.trunc(20 * (hit / np.maximum(n, 1))).astype(np.int64)
+    score += np.where(n > 0, bonus, 0)
+    return np.clip(score, 30, 100)
+
+
+def score_batch(month_elems, extra_elems, favoreds, picks, styles=None):
+    """
+    以字符串输入成批打分（compute_score 的逐条等价物）：
+    picks 为每条的推荐款列表（dict / StyleRow 均可，长度可以不同）。
+    大量共享的 picks 对象（如答案表里的元组）只编码一次；favored 相同的只算一次掩码。
+    全部是同一目录的 StyleRow 时直接按行号从目录的元素编码列 np.take，不逐个取值。
+    """
+    codes = ElementCodes(styles if styles is not None else _catalog_of(picks))
+    objs = dict(zip(map(id, picks), picks))
+    inverse = None
+    if len(objs) * 2 <= len(picks):
+        pos = {k: j for j, k in enumerate(objs)}
+        inverse = np.fromiter(map(pos.__getitem__, map(id, picks)), dtype=np.intp, count=len(picks))
+        picks = list(objs.values())
+    lens = np.fromiter(map(len, picks), dtype=np.intp, count=len(picks))
+    k = int(lens.max()) if len(picks) else 0
+    pc = np.full((len(picks), max(k, 1)), -2, dtype=np.int64)
+    if k:
+        flat = _pick_codes(picks, styles, codes)
+        if len(flat) == len(picks) * k:         # 等长（常见情形）：直接整形
+            pc[:, :k] = flat.reshape(len(picks), k)
+        else:
+            starts = np.cumsum(lens) - lens
+            rows = np.repeat(np.arange(len(picks)), lens)
+            pc[rows, np.arange(len(flat)) - np.repeat(starts, lens)] = flat
+    if inverse is not None:
+        pc = pc[inverse]
+    masks = codes.masks(favoreds)
+    # compute_score 里梅花元素为假值（None / 空串）时不计分
+    extra = codes.encode(extra_elems, empty_is_none=True)
+    return score_codes(codes.encode(month_elems), extra, masks, pc)
+
+
+def _catalog_of(picks):
+    for row in picks:
+        for p in row:
+            return getattr(p, "_cat", None)
+    return None
+
+
+def _pick_codes(picks, styles, codes):
+    """所有推荐款按顺序摊平后的元素编码（与 ElementCodes 同码）。"""
+    cat = StyleCatalog.of(styles) if styles is not None else _catalog_of(picks)
+    col = cat.columns.get("element") if isinstance(cat, StyleCatalog) else None
+    flat = list(chain.from_iterable(picks))
+    if isinstance(col, CodedColumn):
+        try:
+            same = set(map(_CAT, flat)) == {cat}
+        except AttributeError:                  # 混有普通 dict
+            same = False
+        if same:
+            idx = np.fromiter(map(_ROW, flat), dtype=np.intp, count=len(flat))
+            return np.take(np.frombuffer(col.codes, dtype=col.typecode, count=len(cat)), idx)
+    code = codes.code
+    return np.array([code(p.get("element") or "") for p in flat], dtype=np.int64)
+
+
+def score_catalog(styles, month_elem, extra_elem, favored):
+    """
+    把目录中每个 SKU 当作唯一的推荐款打分：
+    等价于对每一行 r 调用 compute_score(goal, month_elem, extra_elem, [r], favored)。
+    直接使用目录的元素编码列，不逐行取值。
+    """
+    cat = StyleCatalog.of(styles)
+    col = cat.columns.get("element")
+    codes = ElementCodes(cat)
+    n = len(cat)
+    if isinstance(col, CodedColumn):
+        elem = np.frombuffer(col.codes, dtype=col.typecode, count=n).astype(np.int64)
+    else:
+        elem = np.full(n, codes.code(""), dtype=np.int64)
+    mask = codes.masks([favored])
+    head = score_codes(codes.encode([month_elem]), codes.encode([extra_elem or None]),
+                       mask, np.full((1, 1), -2))[0]       # 不含推荐款的部分
+    hit = _hits(elem, np.full(n, mask[0], dtype=np.uint64))
+    return np.clip(head + 20 * hit.astype(np.int64), 30, 100)
@@ -1,7 +1,15 @@
 # quiz_cli.py —— 命令行问答 Demo（旧版 Python 兼容版 + 容错）
-# 0 依赖：只用标准库。读取 data/styles.csv，输出到 outputs/ 目录。
+# 0 依赖：只用标准库。读取 data/styles.csv，会话追加写入 outputs/sessions/（见 fortune/sessions.py）。
 
-import csv, json, datetime, pathlib, argparse, sys
+import datetime, argparse, sys
+
+from fortune import metrics
+from fortune.catalog import load_styles
+from fortune.outlook import parse_months, year_outlook
+from fortune.query import pick_styles
+from fortune.render import QuizMarkdown
+from fortune.rules import GOALS, month_element, favored_elements, meihua_element_from_nums
+from fortune.sessions import SessionStore
 
 MSG = {
     "en": {
@@ -13,7 +21,9 @@ MSG = {
         "time": "Enter birth time (HH:MM, optional; Enter to skip): ",
         "nums": "Enter three numbers (comma-separated, e.g., 2,9,8): ",
         "target": "Which year-month do you want to check? (YYYY-MM, e.g., 2025-09): ",
+        "target_outlook": "First month of your outlook? (YYYY-MM, e.g., 2025-09): ",
         "goal": "Pick your focus (type keyword): career / wealth / health / emotion / love / study / social",
+        "budget": "Budget per set in £ (optional; Enter to skip): ",
         "confirm": "Great, generating your reading...",
         "result_title": "Your quick reading",
         "month_elem": "Target month leans **{e}**.",
@@ -21,7 +31,7 @@ MSG = {
         "picks_title": "Your 3 nail picks",
         "cta": "For more personalization, share your nail length/shape or budget.",
         "closing": "Note: This is rules-based inspiration, not professional advice.",
-        "saved": "Saved: {j} and {m}",
+        "saved": "Saved session {id} ({path}). View it with: python -m fortune.sessions get {id} --md",
         "invalid": "Input not recognized, please try again.",
         "fatal": "Oops, something went wrong. See details above.",
     },
@@ -34,7 +44,9 @@ MSG = {
         "time": "请输入出生时间 (HH:MM，可选；直接回车跳过)：",
         "nums": "请输入三个数字（用逗号分隔，如 2,9,8）：",
         "target": "想查看哪一年哪一月？(YYYY-MM，例如 2025-09)：",
+        "target_outlook": "展望从哪一年哪一月开始？(YYYY-MM，例如 2025-09)：",
         "goal": "选择希望提升的方向（输入关键词）：career / wealth / health / emotion / love / study / social",
+        "budget": "每套预算（£，可选；直接回车跳过）：",
         "confirm": "好的，正在为你生成结果……",
         "result_title": "你的简要解读",
         "month_elem": "本月元素倾向 **{e}**。",
@@ -42,27 +54,12 @@ MSG = {
         "picks_title": "为你精选的 3 款",
         "cta": "想要更个性化的选择，可以告诉我指甲长度/形状或预算。",
         "closing": "提示：以上为规则引擎灵感建议，不构成专业意见。",
-        "saved": "已保存：{j} 和 {m}",
+        "saved": "已保存会话 {id}（{path}）。查看：python -m fortune.sessions get {id} --md",
         "invalid": "输入无效，请重试。",
         "fatal": "出错了，上面打印了详细信息。",
     }
 }
 
-MONTH_TO_ELEMENT = {
-    "1":"earth","2":"wood","3":"wood","4":"earth","5":"fire","6":"fire",
-    "7":"earth","8":"metal","9":"metal","10":"earth","11":"water","12":"water"
-}
-GOAL_BIAS = {
-    "career": ["fire","metal"],
-    "wealth": ["metal","earth"],
-    "health": ["water","wood"],
-    "emotion": ["water","earth"],
-    "love":   ["wood","water"],
-    "study":  ["wood","fire"],
-    "social": ["earth","metal"],
-}
-MEIHUA_LASTDIGIT_TO_ELEMENT = {0:"water",1:"metal",2:"metal",3:"fire",4:"wood",5:"wood",6:"water",7:"earth",8:"earth",9:"metal"}
-
 def safe_input(prompt):
     try:
         return input(prompt)
@@ -71,80 +68,54 @@ def safe_input(prompt):
     except KeyboardInterrupt:
         print("\nBye."); sys.exit(0)
 
-def load_styles(path="data/styles.csv"):
-    rows=[]
-    with open(path,"r",encoding="utf-8") as f:
-        for r in csv.DictReader(f):
-            row = {k: ("" if r[k] is None else str(r[k])) for k in r}
-            rows.append(row)
-    return rows
-
-def month_element(ym):
-    try:
-        token = str(ym).strip()
-        if "-" in token:
-            m = int(token.split("-")[-1])
-        elif "/" in token:
-            m = int(token.split("/")[-1])
-        else:
-            m = int(token)
-        return MONTH_TO_ELEMENT.get(str(m), "earth")
-    except Exception:
-        return "earth"
-
-def favored_elements(goal, month_elem_str, extra_elem=None):
-    base = GOAL_BIAS.get(goal, ["fire","metal"])
-    seq = list(base) + [month_elem_str]
-    if extra_elem:
-        seq = [extra_elem] + seq
-    out, seen = [], set()
-    for e in seq:
-        e = "" if e is None else str(e)
-        if e and e not in seen:
-            out.append(e); seen.add(e)
-    return out or ["earth"]
-
-def meihua_element_from_nums(nums):
-    try:
-        if not nums:
-            return None
-        last = int(str(nums[-1])[-1])
-        return MEIHUA_LASTDIGIT_TO_ELEMENT.get(last, "earth")
-    except Exception:
-        return None
-
-def pick_styles(favored, styles, k=3):
-    try:
-        bag=[s for s in styles if (s.get("element") or "") in favored]
-    except Exception:
-        bag=[]
-    if len(bag)<k:
-        for s in styles:
-            if s not in bag: bag.append(s)
-    return bag[:k]
+_MD = QuizMarkdown(MSG)
 
 def render_md(lang, name, ym, month_elem_str, goal, favored, picks):
-    m = MSG.get(lang, MSG["en"])
-    lines=[]
-    lines.append("**Chatbot:** " + m['result_title'])
-    lines.append("- " + m["month_elem"].format(e=str(month_elem_str)))
-    lines.append("- " + m["goal_line"].format(g=str(goal), fav=", ".join([str(x) for x in favored])))
-    lines.append("**Chatbot:** " + m['picks_title'])
-    for i,s in enumerate(picks,1):
-        price_val = s.get("price") or ""
-        price = f" £{price_val}" if str(price_val).strip() else ""
-        name_val = s.get("name") or "Unknown"
-        copy_val = s.get("copy") or ""
-        elem_val = s.get("element") or ""
-        lines.append(f"{i}. **{name_val}**{price} — {copy_val} _(element: {elem_val})_")
-    lines.append("**Chatbot:** " + m['cta'])
-    lines.append("**Chatbot:** " + m['closing'])
-    return "\n".join(lines)
+    # 模板按语言预编译、款式行按 SKU 缓存（fortune/render.py），输出与逐行 f-string 拼接逐字节一致
+    return _MD.render(lang, name, ym, month_elem_str, goal, favored, picks)
+
+def save_outlook(lang, name, mode, dob, btime, nums, months, goal, budget, styles):
+    """年度展望：一段月份合成一条会话（JSON 的 months 数组 + 一份 Markdown），返回 (id, 路径)。"""
+    extra_elem = meihua_element_from_nums(nums) if nums else None
+    entries = year_outlook(months, goal, lambda fav: pick_styles(fav, styles, k=3, max_price=budget),
+                           extra_elem)
+    rows = {}                       # 同组月份共用一份 dict 行
+    for e in entries:
+        if id(e.picks) not in rows:
+            rows[id(e.picks)] = [dict(p) for p in e.picks]
+    out = {
+        "name": name,
+        "method": "birthdate" if mode=="1" else "meihua",
+        "dob": dob, "birth_time": btime, "nums": nums,
+        "goal": goal,
+        "budget": budget,
+        "months": [{"target_month": e.ym, "month_element": e.month_elem,
+                    "elements_considered": e.favored, "picks": rows[id(e.picks)]} for e in entries],
+        "generated_at": datetime.datetime.utcnow().isoformat()+"Z"
+    }
+    with metrics.timed("render"):
+        md = _MD.render_outlook(lang, name, goal, entries)
+    with metrics.timed("save"), SessionStore() as store:
+        sid = store.append(out, md=md)
+    metrics.count("fortune_readings_total", len(entries), entry="quiz_cli")
+    return sid, str(store.path_of(sid))
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--lang", default="en", choices=["en","cn"])
+    parser.add_argument("--outlook", default=None,
+                        help="year outlook: number of months from the target month (e.g. 12) "
+                             "or a range like 2025-01..2025-12")
+    parser.add_argument("--metrics", default=None,
+                        help="write per-stage timings/counters (.prom = Prometheus text, else JSON)")
     args = parser.parse_args()
+    if args.outlook:
+        try:
+            parse_months(args.outlook, "2000-01")
+        except ValueError as e:
+            parser.error(f"--outlook: {e}")
+    if args.metrics:
+        metrics.enable()
     lang = args.lang
     m = MSG[lang]
 
@@ -174,23 +145,49 @@ def main():
         except Exception:
             nums = []
 
-    ym = safe_input(m["target"]).strip() or "2025-09"
-
-    valid_goals = {"career","wealth","health","emotion","love","study","social"}
+    months = None
+    if args.outlook and ".." in args.outlook:
+        months = parse_months(args.outlook)
+        ym = months[0]
+    else:
+        ym = safe_input(m["target_outlook" if args.outlook else "target"]).strip() or "2025-09"
+        while args.outlook and months is None:
+            try:
+                months = parse_months(args.outlook, ym)
+            except ValueError:
+                print(m["invalid"])
+                ym = safe_input(m["target_outlook"]).strip() or "2025-09"
+
+    valid_goals = set(GOALS)
     goal = ""
     while goal not in valid_goals:
         goal = safe_input(m["goal"] + " ").strip().lower()
         if goal not in valid_goals:
             print(m["invalid"])
 
+    budget = None
+    budget_raw = safe_input(m["budget"]).strip().lstrip("£")
+    if budget_raw:
+        try:
+            budget = float(budget_raw)
+        except ValueError:
+            print(m["invalid"])
+
     print(m["confirm"])
 
     try:
         styles = load_styles("data/styles.csv")
-        month_elem_str = month_element(ym)
-        extra_elem = meihua_element_from_nums(nums) if nums else None
-        favored = favored_elements(goal, month_elem_str, extra_elem)
-        picks = pick_styles(favored, styles, k=3)
+        if months:
+            sid, path = save_outlook(lang, name, mode, dob, btime, nums, months, goal, budget, styles)
+            print(m["saved"].format(id=sid, path=path))
+            if args.metrics:
+                metrics.dump(args.metrics)
+            return
+        with metrics.timed("resolve"):
+            month_elem_str = month_element(ym)
+            extra_elem = meihua_element_from_nums(nums) if nums else None
+            favored = favored_elements(goal, month_elem_str, extra_elem)
+        picks = pick_styles(favored, styles, k=3, max_price=budget)
 
         out = {
             "name": name,
@@ -198,20 +195,21 @@ def main():
             "dob": dob, "birth_time": btime, "nums": nums,
             "target_month": ym,
             "goal": goal,
+            "budget": budget,
             "month_element": month_elem_str,
             "elements_considered": favored,
-            "picks": picks,
+            "picks": [dict(p) for p in picks],
             "generated_at": datetime.datetime.utcnow().isoformat()+"Z"
         }
 
-        outdir = pathlib.Path("outputs"); outdir.mkdir(parents=True, exist_ok=True)
-        stem = "session_" + datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        jpath = outdir / (stem + ".json")
-        mpath = outdir / (stem + ".md")
-        jpath.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-        mpath.write_text(render_md(lang, name, ym, month_elem_str, goal, favored, picks), encoding="utf-8")
-
-        print(m["saved"].format(j=str(jpath), m=str(mpath)))
+        with metrics.timed("render"):
+            md = render_md(lang, name, ym, month_elem_str, goal, favored, picks)
+        with metrics.timed("save"), SessionStore() as store:
+            sid = store.append(out, md=md)
+        print(m["saved"].format(id=sid, path=str(store.path_of(sid))))
+        metrics.count("fortune_readings_total", entry="quiz_cli")
+        if args.metrics:
+            metrics.dump(args.metrics)
     except Exception as e:
         print("ERROR:", e)
         print(m["fatal"])
@@ -1,5 +1,12 @@
 # run_demo.py —— 0依赖可运行Demo（规则 + 模板，输出 Markdown 和 JSON）
-import csv, json, argparse, datetime, pathlib
+import json, argparse, datetime, functools, pathlib, time
+
+from fortune import metrics
+from fortune.catalog import load_styles
+from fortune.outlook import parse_months, year_outlook
+from fortune.query import has_constraints, parse_constraints, parse_price, pick_styles
+from fortune.render import DemoMarkdown, dumps
+from fortune.rules import GOALS, month_element, favored_elements
 
 MESSAGES = {
     "cn": {
@@ -18,91 +25,200 @@ MESSAGES = {
     },
 }
 
-# 极简规则（可后续换成八字/梅花）
-MONTH_TO_ELEMENT = {
-    "1":"earth","2":"wood","3":"wood","4":"earth","5":"fire","6":"fire",
-    "7":"earth","8":"metal","9":"metal","10":"earth","11":"water","12":"water"
-}
-GOAL_BIAS = {
-    "career": ["fire","metal"],
-    "wealth": ["metal","earth"],
-    "love":   ["wood","water"],
-    "health": ["water","wood"],
-}
-
-def load_styles(path="data/styles.csv"):
-    rows=[]
-    with open(path,"r",encoding="utf-8") as f:
-        for r in csv.DictReader(f):
-            rows.append(r)
-    return rows
-
-def pick_elements(target_month:str, goal:str):
-    m = int(target_month.split("-")[-1])
-    month_elem = MONTH_TO_ELEMENT.get(str(m), "earth")
-    favored = []
-    seen = set()
-    for e in GOAL_BIAS.get(goal, ["fire","metal"]) + [month_elem]:
-        if e not in seen:
-            favored.append(e); seen.add(e)
-    return month_elem, favored
-
-def pick_styles(favored, styles, k=3):
-    bag=[s for s in styles if s["element"] in favored]
-    if len(bag) < k:
-        for s in styles:
-            if s not in bag:
-                bag.append(s)
-    return bag[:k]
+_MD = DemoMarkdown(MESSAGES)
 
 def render_markdown(lang, name, target_month, notes, picks):
-    msg = MESSAGES["cn" if lang!="en" else "en"]
-    lines=[]
-    lines.append(f"**Chatbot:** {msg['opening'].format(name=name)}")
-    lines.append(f"**Chatbot:** {msg['fortune_intro']}")
-    for n in notes:
-        lines.append(f"- {n}")
-    lines.append(f"**Chatbot:** {msg['picks_intro']}")
-    for i,s in enumerate(picks,1):
-        price = f" £{s['price']}" if s.get("price") else ""
-        lines.append(f"{i}. **{s['name']}**{price} — {s['copy']} _(element: {s['element']})_")
-    lines.append(f"**Chatbot:** {msg['cta']}")
-    lines.append(f"**Chatbot:** {msg['closing']}")
-    return "\n".join(lines)
-
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--name", default="Serena")
-    ap.add_argument("--target_month", default="2025-09")       # 目标月份
-    ap.add_argument("--goal", default="wealth",
-                    choices=["career","wealth","love","health"])
-    ap.add_argument("--lang", default="cn", choices=["cn","en"])
-    args = ap.parse_args()
+    # 模板按语言预编译、款式行按 SKU 缓存（fortune/render.py），输出与逐行 f-string 拼接逐字节一致
+    return _MD.render(lang, name, target_month, notes, picks)
 
-    styles = load_styles("data/styles.csv")
-    month_elem, favored = pick_elements(args.target_month, args.goal)
-    notes = [
-        f"{args.target_month} 的月元素倾向 **{month_elem}**。" if args.lang=="cn"
-        else f"Month {args.target_month} leans **{month_elem}**.",
-        f"目标 **{args.goal}**，优先聚焦元素：{', '.join(favored)}。" if args.lang=="cn"
-        else f"Focus **{args.goal}**, prioritize: {', '.join(favored)}."
+def month_notes(lang, target_month, month_elem, goal, favored):
+    return [
+        f"{target_month} 的月元素倾向 **{month_elem}**。" if lang=="cn"
+        else f"Month {target_month} leans **{month_elem}**.",
+        f"目标 **{goal}**，优先聚焦元素：{', '.join(favored)}。" if lang=="cn"
+        else f"Focus **{goal}**, prioritize: {', '.join(favored)}."
     ]
-    picks = pick_styles(favored, styles, k=3)
+
+def picker(styles, goal, rank=False, constraints=None):
+    """favored → 3 款：rank=True 时打分排序（max_price 作预算），否则取前 k 个命中。"""
+    if rank:
+        from fortune.ranking import rank_styles     # 只有 --rank 才加载排序模块
+        budget = (constraints or {}).get("max_price")
+        def pick(favored):
+            with metrics.timed("rank"):
+                return rank_styles(favored, styles, k=3, goal=goal, budget=budget)
+        return pick
+    return lambda favored: pick_styles(favored, styles, k=3, **(constraints or {}))
+
+def make_reading(name, target_month, goal, lang, styles, rank=False, constraints=None):
+    """单条解读：返回 (JSON 结果, Markdown)。单条模式与批量模式共用。
+    rank=True 时用打分排序（元素排名 + 氛围契合，max_price 作预算）代替“前 k 个命中”；
+    constraints 为 vibes / tones / min_price / max_price 个性化条件。
+    结果里的 picks 是 StyleRow，用 fortune.render.dumps 序列化（与 json.dumps 输出一致）。"""
+    constraints = {k: v for k, v in (constraints or {}).items() if v is not None}
+    with metrics.timed("resolve"):
+        month_elem = month_element(target_month)
+        favored = favored_elements(goal, month_elem)
+    notes = month_notes(lang, target_month, month_elem, goal, favored)
+    picks = picker(styles, goal, rank, constraints)(favored)
 
     out = {
-        "name": args.name,
-        "target_month": args.target_month,
-        "goal": args.goal,
+        "name": name,
+        "target_month": target_month,
+        "goal": goal,
         "month_element": month_elem,
         "elements_considered": favored,
-        "picks": picks,
+        "picks": list(picks),       # StyleRow：由 fortune.render.dumps 直接拼接缓存的行 JSON
         "generated_at": datetime.datetime.utcnow().isoformat()+"Z"
     }
+    if has_constraints(**constraints):
+        out["constraints"] = constraints
+    with metrics.timed("render"):
+        md = render_markdown(lang, name, target_month, notes, picks)
+    metrics.count("fortune_readings_total", entry="run_demo")
+    return out, md
 
+def make_outlook(name, months, goal, lang, styles, rank=False, constraints=None):
+    """
+    年度展望：months（YYYY-MM 列表）一次算完，返回 (合并的 JSON 结果, 合并的 Markdown)。
+    目标偏好只算一次；主导元素相同的月份共用 favored 与选款（fortune/outlook.py）。
+    """
+    constraints = {k: v for k, v in (constraints or {}).items() if v is not None}
+    entries = year_outlook(months, goal, picker(styles, goal, rank, constraints))
+    out = {
+        "name": name,
+        "goal": goal,
+        "months": [{"target_month": m.ym, "month_element": m.month_elem,
+                    "elements_considered": m.favored, "picks": list(m.picks)}  # StyleRow，同上
+                   for m in entries],
+        "generated_at": datetime.datetime.utcnow().isoformat()+"Z"
+    }
+    if has_constraints(**constraints):
+        out["constraints"] = constraints
+    with metrics.timed("render"):
+        md = _MD.render_outlook(lang, name, [
+            (m.ym, month_notes(lang, m.ym, m.month_elem, goal, m.favored), m.picks) for m in entries])
+    metrics.count("fortune_readings_total", len(entries), entry="run_demo")
+    return out, md
+
+def batch_record(item, styles, defaults, want_md=False):
+    """
+    处理一行 JSONL 输入，返回 (行号, 结果 JSON 行, Markdown 或 None, 是否成功)。
+    模块级函数：进程池按名引用，序列化工作也在子进程里完成。
+    """
+    lineno, line = item
+    try:
+        rec = json.loads(line)
+        target_month = str(rec.get("target_month", defaults["target_month"]))
+        outlook = rec.get("outlook", defaults.get("outlook"))
+        common = (rec.get("name", defaults["name"]),
+                parse_months(outlook, target_month) if outlook else target_month,
+                rec.get("goal", defaults["goal"]), rec.get("lang", defaults["lang"]), styles)
+        out, md = (make_outlook if outlook else make_reading)(
+            *common, rank=defaults.get("rank", False),
+            constraints=parse_constraints(**{k: rec.get(k, v) for k, v in defaults["constraints"].items()}))
+    except Exception as e:
+        return lineno, json.dumps({"line": lineno, "error": str(e)}, ensure_ascii=False), None, False
+    return lineno, dumps(out), (md if want_md else None), True
+
+def cli_constraints(args):
+    return parse_constraints(args.vibe, args.tone, args.min_price, args.max_price)
+
+def run_batch(args, styles):
+    """
+    批量模式：逐行读取 JSONL（name / target_month / goal / lang，
+    以及可选的 vibes / tones / min_price / max_price / outlook；缺省取命令行参数），
+    带 outlook 的行输出该用户的一份年度展望（见 make_outlook），
+    逐行写出 JSONL 结果；内存占用与输入大小无关。
+    出错的行写 {"line": n, "error": "..."}，不中断整批。
+    --workers > 1 时分块交给进程池，输出顺序与单进程一致。
+    """
+    from fortune.parallel import bulk_map
+    out_path = pathlib.Path(args.batch_out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    md_dir = pathlib.Path(args.md_dir) if args.md_dir else None
+    if md_dir:
+        md_dir.mkdir(parents=True, exist_ok=True)
+    defaults = {"name": args.name, "target_month": args.target_month,
+                "goal": args.goal, "lang": args.lang, "rank": args.rank, "outlook": args.outlook,
+                "constraints": cli_constraints(args)}
+    func = functools.partial(batch_record, defaults=defaults, want_md=md_dir is not None)
+
+    n_ok = n_err = 0
+    t0 = time.perf_counter()
+    with open(args.batch, "r", encoding="utf-8") as fin, \
+         open(out_path, "w", encoding="utf-8") as fout:
+        items = ((i, line) for i, line in enumerate(fin, 1) if line.strip())
+        for lineno, text, md, ok in bulk_map(func, items, styles,
+                                             workers=args.workers, chunksize=args.chunksize):
+            fout.write(text + "\n")
+            if not ok:
+                n_err += 1
+                continue
+            n_ok += 1
+            if md is not None:
+                (md_dir/f"{lineno:08d}.md").write_text(md, encoding="utf-8")
+    dt = time.perf_counter() - t0
+    rate = (n_ok + n_err) / dt if dt > 0 else 0.0
+    print(f"✅ {n_ok} ok / {n_err} errors → {out_path}  ({rate:,.0f} records/sec)")
+
+def run_outlook(args, styles):
+    months = parse_months(args.outlook, args.target_month)
+    out, md = make_outlook(args.name, months, args.goal, args.lang, styles,
+                           rank=args.rank, constraints=cli_constraints(args))
     outdir = pathlib.Path("outputs"); outdir.mkdir(parents=True, exist_ok=True)
-    (outdir/"recommend.json").write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-    (outdir/"recommend.md").write_text(render_markdown(args.lang, args.name, args.target_month, notes, picks), encoding="utf-8")
+    (outdir/"outlook.json").write_text(dumps(out, indent=2), encoding="utf-8")
+    (outdir/"outlook.md").write_text(md, encoding="utf-8")
+    print(f"✅ 已生成 {months[0]}..{months[-1]} 的展望：outputs/outlook.json 和 outputs/outlook.md")
+
+def run_single(args, styles):
+    out, md = make_reading(args.name, args.target_month, args.goal, args.lang, styles,
+                           rank=args.rank, constraints=cli_constraints(args))
+    outdir = pathlib.Path("outputs"); outdir.mkdir(parents=True, exist_ok=True)
+    (outdir/"recommend.json").write_text(dumps(out, indent=2), encoding="utf-8")
+    (outdir/"recommend.md").write_text(md, encoding="utf-8")
     print("✅ 已生成 outputs/recommend.json 和 outputs/recommend.md")
 
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--name", default="Serena")
+    ap.add_argument("--target_month", default="2025-09")       # 目标月份
+    ap.add_argument("--goal", default="wealth",
+                    choices=list(GOALS))
+    ap.add_argument("--lang", default="cn", choices=["cn","en"])
+    ap.add_argument("--rank", action="store_true", help="按打分排序选款（默认取前 k 个命中）")
+    ap.add_argument("--outlook", default=None,
+                    help="年度展望：从 target_month 起的月数（如 12），或区间 2025-01..2025-12")
+    ap.add_argument("--vibe", default=None, help="偏好氛围标签，逗号分隔，如 Focus,Calm")
+    ap.add_argument("--tone", default=None, help="偏好色调，逗号分隔")
+    ap.add_argument("--min_price", type=parse_price, default=None)
+    ap.add_argument("--max_price", type=parse_price, default=None, help="预算上限（£）")
+    ap.add_argument("--batch", help="JSONL 输入，每行一个 {name, target_month, goal, lang}")
+    ap.add_argument("--batch_out", default="outputs/recommend.jsonl")
+    ap.add_argument("--md_dir", default=None, help="批量模式下可选：每条记录写一份 Markdown")
+    ap.add_argument("--workers", type=int, default=1, help="批量模式的进程数（0 = CPU 核数）")
+    ap.add_argument("--chunksize", type=int, default=256)
+    ap.add_argument("--metrics", default=None,
+                    help="写出分阶段耗时与计数：.prom 为 Prometheus 文本，其余为 JSON")
+    args = ap.parse_args()
+    if args.outlook and not args.batch:
+        try:
+            parse_months(args.outlook, args.target_month)
+        except ValueError as e:
+            ap.error(f"--outlook: {e}")
+    if args.metrics:
+        metrics.enable()
+
+    styles = load_styles("data/styles.csv")
+    if args.batch:
+        run_batch(args, styles)
+    elif args.outlook:
+        run_outlook(args, styles)
+    else:
+        run_single(args, styles)
+    if args.metrics:
+        metrics.dump(args.metrics)
+        print(f"📈 metrics → {args.metrics}")
+
 if __name__ == "__main__":
     main()
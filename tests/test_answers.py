@@ -0,0 +1,63 @@
+# tests/test_answers.py —— 预编译答案表（fortune.answers）：与逐条计算一致，目录替换后随之回收
+import csv
+import gc
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import weakref
+
+from fortune.answers import (
+    DIGITS, MONTHS, answer_table, answer_table_stats, compute_answer, lookup_answer,
+)
+from fortune.catalog import StyleCatalog
+from fortune.reload import CatalogManager
+from fortune.rules import GOAL_BIAS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class AnswerTableTest(unittest.TestCase):
+    def test_matches_compute_answer(self):
+        cat = StyleCatalog.from_csv(os.path.join(ROOT, "data", "styles.csv"))
+        table = answer_table(cat)
+        self.assertIs(answer_table(cat), table)
+        for m in MONTHS:
+            for g in list(GOAL_BIAS) + ["bogus"]:
+                for d in DIGITS:
+                    self.assertEqual(table.get(m, g, d), compute_answer(m, g, d, cat))
+        self.assertEqual(lookup_answer(cat, "2025/9", "wealth", "12 3"),
+                         compute_answer(9, "wealth", 3, cat))
+
+    def test_replaced_catalogs_are_collected(self):
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d, True)
+        path = os.path.join(d, "styles.csv")
+
+        def write(tag):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                w = csv.writer(f)
+                w.writerow(["sku", "name", "element", "copy", "price"])
+                w.writerows([[f"S{i}", f"N{i}{tag}", e, "c", "9.99"]
+                             for i, e in enumerate(["fire", "earth", "wood", "metal", "water"])])
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9 * len(tag)))
+
+        write("")
+        manager = CatalogManager(path)
+        refs = []
+        for n in range(1, 5):                           # 4 次热重载，每个版本都建过答案表
+            cat = manager.get()
+            lookup_answer(cat, "2025-09", "wealth")
+            refs.append(weakref.ref(cat))
+            del cat
+            write("x" * n)
+            manager.refresh()
+        lookup_answer(manager.get(), "2025-09", "wealth")
+        gc.collect()
+        self.assertEqual([r() for r in refs], [None] * 4)
+        self.assertGreaterEqual(answer_table_stats()["tables"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# tests/test_query.py —— 条件归一化（parse_tags / parse_price / parse_constraints）与 JSONL 批量的条件
+import json
+import unittest
+
+import run_demo
+from fortune.catalog import StyleCatalog
+from fortune.query import parse_constraints, parse_price, parse_tags, pick_styles
+
+ROWS = [{"sku": f"S{i}", "name": f"N{i}", "element": "metal" if i < 5 else "earth", "tone": "gold",
+         "vibe": "Focus" if i >= 3 else "Calm", "copy": "c", "price": f"{i + 9}.99"} for i in range(10)]
+
+
+class ParseTest(unittest.TestCase):
+    def test_tags(self):
+        self.assertEqual(parse_tags("Focus, Calm,,"), ["Focus", "Calm"])
+        self.assertEqual(parse_tags(["Focus", 1]), ["Focus", "1"])
+        for empty in (None, "", " , ", []):
+            self.assertIsNone(parse_tags(empty))
+        with self.assertRaises(ValueError):
+            parse_tags({"Focus": 1})
+
+    def test_price(self):
+        self.assertEqual(parse_price("12.5"), 12.5)
+        self.assertEqual(parse_price(15), 15.0)
+        self.assertIsNone(parse_price(""))
+        for bad in ("cheap", [1], "nan", "inf", float("-inf"), 1e400):
+            with self.assertRaises(ValueError, msg=bad):
+                parse_price(bad)
+
+    def test_constraints(self):
+        self.assertEqual(parse_constraints("Focus", None, "10", 20),
+                         {"vibes": ["Focus"], "tones": None, "min_price": 10.0, "max_price": 20.0})
+
+
+class BatchConstraintsTest(unittest.TestCase):
+    DEFAULTS = {"name": "a", "target_month": "2025-09", "goal": "wealth", "lang": "en",
+                "rank": False, "outlook": None,
+                "constraints": {"vibes": None, "tones": None, "min_price": None, "max_price": None}}
+
+    def record(self, rec):
+        _, text, _, ok = run_demo.batch_record((1, json.dumps(rec)), StyleCatalog(ROWS), self.DEFAULTS)
+        return ok, json.loads(text)
+
+    def test_string_vibes_filter(self):
+        cat = StyleCatalog(ROWS)
+        want = [r["sku"] for r in pick_styles(["metal", "earth"], cat, 3, vibes=["Focus"])]
+        for vibes in ("Focus", ["Focus"], " Focus ,"):
+            ok, out = self.record({"vibes": vibes})
+            self.assertTrue(ok)
+            self.assertEqual(out["constraints"], {"vibes": ["Focus"]})
+            self.assertEqual([p["sku"] for p in out["picks"]], want)
+            self.assertNotEqual(want, [p["sku"] for p in self.record({})[1]["picks"]])
+
+    def test_prices_and_errors(self):
+        ok, out = self.record({"max_price": "12"})
+        self.assertEqual(out["constraints"], {"max_price": 12.0})
+        self.assertTrue(all(float(p["price"]) <= 12 for p in out["picks"]))
+        for bad in ({"max_price": "nan"}, {"min_price": "cheap"}, {"tones": 3}):
+            ok, out = self.record(bad)
+            self.assertFalse(ok)
+            self.assertIn("error", out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+# tests/test_ranking.py —— rank_styles 与“逐行 score_style 全量排序”一致（含各种预算）
+import random
+import unittest
+
+from fortune.catalog import StyleCatalog
+from fortune.ranking import rank_styles, score_style
+
+ELEMENTS = ["wood", "fire", "earth", "metal", "water", ""]
+PRICES = ["", "abc", "5", "9.99", "10", "12.5", "15", "15.01", "30"]
+
+
+class RankStylesTest(unittest.TestCase):
+    def test_matches_full_sort(self):
+        rnd = random.Random(5)
+        for _ in range(200):
+            n = rnd.randint(0, 80)
+            rows = [{"sku": f"S{i}", "element": rnd.choice(ELEMENTS),
+                     "vibe": rnd.choice(["Focus|Calm", "Radiant", "Heal|Social", ""]),
+                     "price": rnd.choice(PRICES + [str(rnd.randint(1, 40))])} for i in range(n)]
+            if rnd.random() < .3:                   # 全部有价格：预算下限决定展开上界
+                for r in rows:
+                    r["price"] = str(rnd.randint(6, 30))
+            cat = StyleCatalog(rows)
+            for _ in range(10):
+                fav = rnd.sample(ELEMENTS[:5], rnd.randint(0, 4))
+                goal = rnd.choice([None, "career", "love", "health"])
+                budget = rnd.choice([None, 0, 1, 5.5, 9.99, 10, 15, 100])
+                k = rnd.randint(0, 6)
+                want = sorted(range(n), key=lambda i: ((rows[i]["element"] or "") not in fav,
+                                                       -score_style(cat[i], fav, goal, budget), i))[:k]
+                got = [r["sku"] for r in rank_styles(fav, cat, k, goal=goal, budget=budget)]
+                self.assertEqual(got, [rows[i]["sku"] for i in want], (fav, goal, budget, k))
+
+
+if __name__ == "__main__":
+    unittest.main()
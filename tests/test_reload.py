@@ -0,0 +1,211 @@
+# tests/test_reload.py —— 增量重载与整体重建的等价性（fortune.reload）
+# 随机改行 / 追加 / 删行 / 插行 / 调序 / 重复行后，reload_catalog 的结果必须与 StyleCatalog.from_csv 完全一致：
+# 列值、by_element、去重补位序、行 hash、查询索引、排序分组，以及各种条件下的选款。
+import csv
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+from fortune.catalog import CatalogCache, StyleCatalog
+from fortune.query import QueryIndex, pick_styles
+from fortune.ranking import _groups
+from fortune.reload import CatalogManager, reload_catalog, row_hashes
+from fortune.snapshot import build_snapshot, load_snapshot
+
+FIELDS = ["sku", "name", "element", "tone", "vibe", "copy", "price"]
+ELEMENTS = ["earth", "fire", "wood", "metal", "water", ""]
+FAVOREDS = (["fire"], ["earth", "water"], ["x"], [])
+CONSTRAINTS = ({}, {"max_price": 13.0}, {"vibes": ["Focus"]}, {"tones": ["gold"], "min_price": 10})
+
+
+class ReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.rnd = random.Random(3)
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "styles.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def row(self, i, salt=""):
+        rnd = self.rnd
+        return [f"S{i}", f"N{i}{salt}", rnd.choice(ELEMENTS), rnd.choice(["cool", "gold", "rosy"]),
+                "|".join(rnd.sample(["Focus", "Calm", "Bold", "New" + salt], 2)), "c",
+                rnd.choice(["", "12.9", "13", "abc", "7.50"])]
+
+    def write(self, rows):
+        with open(self.path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(FIELDS)
+            w.writerows(rows)
+
+    def assertSameCatalog(self, a, b):
+        self.assertEqual(len(a), len(b))
+        self.assertEqual([a._values(i) for i in range(len(a))], [b._values(i) for i in range(len(b))])
+        self.assertEqual({k: list(v) for k, v in a.by_element.items()},
+                         {k: list(v) for k, v in b.by_element.items()})
+        self.assertEqual(list(a._fallback), list(b._fallback))
+        self.assertEqual(list(row_hashes(a)), list(b._row_hashes))
+        qa, qb = QueryIndex.of(a), QueryIndex.of(b)
+        self.assertEqual({k: list(v) for k, v in qa.by_tag.items()},
+                         {k: list(v) for k, v in qb.by_tag.items()})
+        self.assertEqual({k: list(v) for k, v in qa.by_tone.items()},
+                         {k: list(v) for k, v in qb.by_tone.items()})
+        self.assertEqual(list(qa.price_keys), list(qb.price_keys))
+        self.assertEqual(list(qa.price_rows), list(qb.price_rows))
+        self.assertEqual({k: list(v) for k, v in _groups(a).items()},
+                         {k: list(v) for k, v in _groups(b).items()})
+        for fav in FAVOREDS:
+            for kw in CONSTRAINTS:
+                self.assertEqual([dict(r) for r in pick_styles(fav, a, 5, **kw)],
+                                 [dict(r) for r in pick_styles(fav, b, 5, **kw)])
+
+    def edit(self, rows, kind):
+        rnd, new = self.rnd, [list(r) for r in rows]
+        if kind in ("edit", "mixed") and new:
+            for _ in range(rnd.randint(1, 3)):
+                j = rnd.randrange(len(new))
+                r = self.row(0, "x")
+                r[0] = new[j][0]
+                new[j] = r
+        if kind == "dup" and len(new) > 1:          # 某行改成与另一行内容相同（sku 不变）
+            j, k = rnd.sample(range(len(new)), 2)
+            new[j] = list(new[k])
+            new[j][0] = rows[j][0]
+        if kind in ("append", "mixed"):
+            new += [self.row(1000 + t) for t in range(rnd.randint(1, 3))]
+            if rnd.random() < .5 and rows:
+                new.append(list(rows[0]))
+        if kind in ("remove", "splice") and new:
+            for _ in range(rnd.randint(1, 2)):
+                if new:
+                    del new[rnd.randrange(len(new))]
+        if kind in ("insert", "splice"):
+            for t in range(rnd.randint(1, 2)):
+                r = self.row(2000 + t) if rnd.random() < .7 or not rows else list(rnd.choice(rows))
+                new.insert(rnd.randrange(len(new) + 1), r)
+        if kind == "swap" and len(new) > 1:
+            j, k = rnd.sample(range(len(new)), 2)
+            new[j], new[k] = new[k], new[j]
+        return new
+
+    def test_matches_full_rebuild(self):
+        modes = set()
+        for trial in range(300):
+            rows = [self.row(i) for i in range(self.rnd.randint(0, 40))]
+            for _ in range(self.rnd.randint(0, 5)):     # 重复行
+                if rows:
+                    rows.insert(self.rnd.randrange(len(rows) + 1), list(rows[self.rnd.randrange(len(rows))]))
+            self.write(rows)
+            old = StyleCatalog.from_csv(self.path)
+            if trial % 3 == 0:                          # 一部分目录先建好索引，走“补丁索引”路径
+                QueryIndex.of(old)
+                _groups(old)
+            before = [old._values(i) for i in range(len(old))]
+            self.write(self.edit(rows, self.rnd.choice(["edit", "append", "remove", "insert", "splice", "swap", "dup", "mixed"])))
+            new, report = reload_catalog(old, self.path)
+            modes.add(report["mode"])
+            self.assertSameCatalog(new, StyleCatalog.from_csv(self.path))
+            self.assertEqual([old._values(i) for i in range(len(old))], before, "old catalog mutated")
+        self.assertEqual(modes, {"incremental", "full", "unchanged"})
+
+    def test_modes(self):
+        rows = [self.row(i) for i in range(40)]
+        self.write(rows)
+        old = StyleCatalog.from_csv(self.path)
+        new, report = reload_catalog(old, self.path)
+        self.assertIs(new, old)
+        self.assertEqual(report["mode"], "unchanged")
+        rows[4][1] = "renamed"
+        rows.append(self.row(40))
+        self.write(rows)
+        new, report = reload_catalog(old, self.path)
+        self.assertEqual(report, {"mode": "incremental", "added": 1, "changed": 1, "removed": 0})
+        self.assertNotEqual(new.version, old.version)
+        del rows[0]                                     # 删行、中间插行也按 sku 对齐走增量
+        rows.insert(20, self.row(41))
+        self.write(rows)
+        newer, report = reload_catalog(new, self.path)
+        self.assertEqual(report, {"mode": "incremental", "added": 1, "changed": 0, "removed": 1})
+        self.assertSameCatalog(newer, StyleCatalog.from_csv(self.path))
+        self.rnd.shuffle(rows)                          # 整体调序：改动太多，整体重建
+        self.write(rows)
+        self.assertEqual(reload_catalog(newer, self.path)[1]["mode"], "full")
+
+    def test_snapshot_backed_catalog(self):
+        rows = [self.row(i) for i in range(50)]
+        self.write(rows)
+        old = load_snapshot(build_snapshot(self.path), self.path)
+        self.assertIsNotNone(old)
+        QueryIndex.of(old)
+        rows[3][2] = "fire" if rows[3][2] != "fire" else "wood"
+        rows.append(self.row(99))
+        del rows[10]                                    # 字符串列是快照里的 PackedStrings：拼接时先转成 list
+        self.write(rows)
+        new, report = reload_catalog(old, self.path)
+        self.assertEqual((report["mode"], report["removed"]), ("incremental", 1))
+        self.assertSameCatalog(new, StyleCatalog.from_csv(self.path))
+
+    def test_manager_swaps_on_refresh(self):
+        rows = [self.row(i) for i in range(20)]
+        self.write(rows)
+        manager = CatalogManager(self.path)
+        c0 = manager.get()
+        self.assertIs(manager.refresh(), c0)            # 文件没变：不重载
+        name = rows[5][1]
+        rows[5][1] = "renamed"
+        self.write(rows)
+        os.utime(self.path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        self.assertIs(manager.get(), c0)                # get() 只读引用，不触发重载
+        c1 = manager.refresh()
+        self.assertIsNot(c1, c0)
+        self.assertEqual(c1[5]["name"], "renamed")
+        self.assertEqual(c0[5]["name"], name)           # 旧对象原样保留
+        self.assertEqual((manager.stats["reloads"], manager.stats["incremental"]), (1, 1))
+        with self.assertRaises(ValueError):
+            manager.watch(0)
+
+    def test_bad_file_keeps_watching(self):
+        rows = [self.row(i) for i in range(20)]
+        self.write(rows)
+        manager = CatalogManager(self.path)
+        c0 = manager.get()
+        with open(self.path, "a", encoding="utf-8") as f:      # 超过 csv 字段长度上限 → csv.Error
+            f.write('S99,"' + "x" * (csv.field_size_limit() + 1) + '"\n')
+        os.utime(self.path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        self.assertIs(manager.refresh(), c0)
+        self.assertEqual(manager.stats["errors"], 1)
+        thread = manager.watch(0.01)
+        try:
+            rows[1][1] = "renamed"
+            self.write(rows)
+            os.utime(self.path, ns=(time.time_ns(), time.time_ns() + 2 * 10**9))
+            deadline = time.monotonic() + 5
+            while manager.get() is c0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(thread.is_alive())
+            self.assertEqual(manager.get()[1]["name"], "renamed")
+        finally:
+            manager.stop()
+
+    def test_cache_counts_only_real_incremental_reloads(self):
+        rows = [self.row(i) for i in range(20)]
+        self.write(rows)
+        cache = CatalogCache()
+        c0 = cache.get(self.path)
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))   # 只改 mtime，内容不变
+        self.assertIs(cache.get(self.path), c0)
+        rows[2][1] = "renamed"
+        self.write(rows)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+        self.assertEqual(cache.get(self.path)[2]["name"], "renamed")
+        stats = cache.stats()
+        self.assertEqual((stats["reloads"], stats["incremental"]), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+# tests/test_render.py —— fortune.render 与各入口原始 f-string 实现 / json.dumps 的逐字节一致性
+# 参考实现照抄自预编译之前的 quiz_cli.render_md、run_demo.render_markdown、app.render_markdown。
+import json
+import random
+import unittest
+
+from fortune.catalog import StyleCatalog
+from fortune.render import AppMarkdown, DemoMarkdown, QuizMarkdown, dumps
+from fortune.rules import favored_elements
+
+# 文案里故意放进花括号、占位符样式的文字与中文，检验模板拆分
+QUIZ_MSG = {
+    "en": {"result_title": "Result {x}", "month_elem": "Month element: {e}",
+           "goal_line": "Goal {g} → {fav} {{lit}}", "picks_title": "Picks",
+           "cta": "Buy {now}", "closing": "Bye"},
+    "cn": {"result_title": "结果", "month_elem": "{e}{e} 月", "goal_line": "{fav}｜{g}",
+           "picks_title": "推荐", "cta": "", "closing": "再见 {{}}"},
+}
+DEMO_MSG = {
+    "en": {"opening": "Hi {name}! {{ok}}", "fortune_intro": "Intro {x}", "picks_intro": "Picks",
+           "cta": "CTA", "closing": "Bye"},
+    "cn": {"opening": "{name}{name}，你好", "fortune_intro": "运势", "picks_intro": "推荐款式",
+           "cta": "", "closing": "{再见}"},
+}
+APP_MSG = {
+    "en": {"title": "Title {t}", "summary_title": "Summary", "month_energy": "{ym}: {elem}",
+           "goal_energy": "{goal} → {fav}", "meihua_energy": "Meihua {extra} {{x}}",
+           "score": "Score {s}", "suggestions": "Tips", "picks_title": "Picks",
+           "reason": "why {r}", "footer": "footer"},
+    "cn": {"title": "标题", "summary_title": "摘要", "month_energy": "{elem}（{ym}）",
+           "goal_energy": "{fav}", "meihua_energy": "{extra}", "score": "分数",
+           "suggestions": "建议 {{}}", "picks_title": "推荐", "reason": "理由", "footer": ""},
+}
+
+
+def ref_quiz(lang, name, ym, month_elem_str, goal, favored, picks):
+    m = QUIZ_MSG.get(lang, QUIZ_MSG["en"])
+    lines=[]
+    lines.append("**Chatbot:** " + m['result_title'])
+    lines.append("- " + m["month_elem"].format(e=str(month_elem_str)))
+    lines.append("- " + m["goal_line"].format(g=str(goal), fav=", ".join([str(x) for x in favored])))
+    lines.append("**Chatbot:** " + m['picks_title'])
+    for i,s in enumerate(picks,1):
+        price_val = s.get("price") or ""
+        price = f" £{price_val}" if str(price_val).strip() else ""
+        name_val = s.get("name") or "Unknown"
+        copy_val = s.get("copy") or ""
+        elem_val = s.get("element") or ""
+        lines.append(f"{i}. **{name_val}**{price} — {copy_val} _(element: {elem_val})_")
+    lines.append("**Chatbot:** " + m['cta'])
+    lines.append("**Chatbot:** " + m['closing'])
+    return "\n".join(lines)
+
+
+def ref_demo(lang, name, target_month, notes, picks):
+    msg = DEMO_MSG["cn" if lang!="en" else "en"]
+    lines=[]
+    lines.append(f"**Chatbot:** {msg['opening'].format(name=name)}")
+    lines.append(f"**Chatbot:** {msg['fortune_intro']}")
+    for n in notes:
+        lines.append(f"- {n}")
+    lines.append(f"**Chatbot:** {msg['picks_intro']}")
+    for i,s in enumerate(picks,1):
+        price = f" £{s['price']}" if s.get("price") else ""
+        lines.append(f"{i}. **{s['name']}**{price} — {s['copy']} _(element: {s['element']})_")
+    lines.append(f"**Chatbot:** {msg['cta']}")
+    lines.append(f"**Chatbot:** {msg['closing']}")
+    return "\n".join(lines)
+
+
+def ref_app(T, name, ym, month_elem_str, goal, favored, extra_elem, score, tips, picks):
+    lines=[f"# {T['title']}", f"**{name}** · {ym}", "", f"## {T['summary_title']}"]
+    lines.append("- " + T["month_energy"].format(ym=ym, elem=month_elem_str))
+    lines.append("- " + T["goal_energy"].format(goal=goal, fav=", ".join(favored)))
+    if extra_elem:
+        lines.append("- " + T["meihua_energy"].format(extra=extra_elem))
+    lines += ["", f"**{T['score']}: {score}/100**", "", f"## {T['suggestions']}"]
+    lines += [f"{i}. {t}" for i,t in enumerate(tips,1)]
+    lines += ["", f"## {T['picks_title']}"]
+    for i,s in enumerate(picks,1):
+        price = f" £{s['price']}" if s.get("price") else ""
+        lines.append(f"{i}. **{s.get('name','')}**{price} — {s.get('copy','')} _({T['reason']}: {s.get('element','')})_")
+    lines += ["", f"_{T['footer']}_"]
+    return "\n".join(lines)
+
+
+def make_catalog(rnd, n=60, tag=""):
+    rows = [{"sku": f"S{i}", "name": rnd.choice(["A", "", "Ünï {x}", "名字"]) + tag,
+             "element": rnd.choice(["metal", "fire", "", "wood"]), "tone": "t", "vibe": "Calm",
+             "copy": rnd.choice(["c", "", "{}", "文案", 'q"uote\\']),
+             "price": rnd.choice(["12.99", "", "abc", " ", "0", "7"])} for i in range(n)]
+    return StyleCatalog(rows)
+
+
+class MarkdownTest(unittest.TestCase):
+    def setUp(self):
+        self.rnd = random.Random(17)
+        self.cat = make_catalog(self.rnd)
+
+    def picks(self, cat=None):
+        cat = cat or self.cat
+        picks = [cat[self.rnd.randrange(len(cat))] for _ in range(self.rnd.randint(0, 3))]
+        if self.rnd.random() < 0.2:
+            picks = [dict(p) for p in picks]        # 普通 dict 也要能渲染（不进缓存）
+        return picks
+
+    def test_matches_reference(self):
+        quiz, demo, app = QuizMarkdown(QUIZ_MSG), DemoMarkdown(DEMO_MSG), AppMarkdown(APP_MSG)
+        rnd = self.rnd
+        for _ in range(1500):
+            picks = self.picks()
+            lang = rnd.choice(["en", "cn", "xx"])
+            goal = rnd.choice(["love", "wealth", "bogus"])
+            me = rnd.choice(["metal", "earth"])
+            extra = rnd.choice([None, "", "fire"])
+            fav = favored_elements(goal, me, extra or None)
+            name = rnd.choice(["bob", "{x}", 5])
+            ym = rnd.choice(["2025-09", "x"])
+            self.assertEqual(quiz.render(lang, name, ym, me, goal, fav, picks),
+                             ref_quiz(lang, name, ym, me, goal, fav, picks))
+            notes = ["n1 {x}", "n2"][:rnd.randint(0, 2)]
+            self.assertEqual(demo.render(lang, name, ym, notes, picks),
+                             ref_demo(lang, name, ym, notes, picks))
+            if lang in APP_MSG:
+                tips = ["tip {0}", "二"][:rnd.randint(0, 2)]
+                score = rnd.randint(30, 100)
+                self.assertEqual(
+                    app.render(lang, name, ym, me, goal, fav, extra, score, tips, picks),
+                    ref_app(APP_MSG[lang], name, ym, me, goal, fav, extra, score, tips, picks))
+        self.assertGreater(quiz.rows.hits, 0)
+
+    def test_row_cache_follows_catalog_version(self):
+        quiz = QuizMarkdown(QUIZ_MSG)
+        other = make_catalog(random.Random(17), tag="·v2")      # 行号相同、内容不同
+        for cat in (self.cat, other, self.cat):
+            picks = [cat[0], cat[1]]
+            self.assertEqual(quiz.render("en", "n", "2025-09", "metal", "love", ["metal"], picks),
+                             ref_quiz("en", "n", "2025-09", "metal", "love", ["metal"], picks))
+
+
+class DumpsTest(unittest.TestCase):
+    def setUp(self):
+        self.rnd = random.Random(23)
+        self.cat = make_catalog(self.rnd)
+
+    def rows(self):
+        return [self.cat[self.rnd.randrange(len(self.cat))] for _ in range(self.rnd.randint(1, 3))]
+
+    def value(self, depth=0):
+        rnd = self.rnd
+        kind = rnd.randrange(8 if depth < 3 else 4)
+        if kind == 0:
+            return rnd.choice([None, True, 0, -3, 1.5, "s", "名", 'q"\\', "\x00rows0\x00"])
+        if kind == 1:
+            return []
+        if kind == 2:
+            return {}
+        if kind == 3:
+            return self.rows()
+        if kind in (4, 5):
+            return {rnd.choice(["a", "picks", "名", "x y"]) + str(i): self.value(depth + 1)
+                    for i in range(rnd.randint(1, 4))}
+        return [self.value(depth + 1) for _ in range(rnd.randint(1, 4))]
+
+    def plain(self, v):
+        if isinstance(v, list) and v and all(hasattr(r, "_cat") for r in v):
+            return [dict(r) for r in v]
+        if isinstance(v, dict):
+            return {k: self.plain(x) for k, x in v.items()}
+        if isinstance(v, list):
+            return [self.plain(x) for x in v]
+        return v
+
+    def test_matches_json_dumps(self):
+        for _ in range(800):
+            obj = {"name": "n", "picks": self.rows(), "months": [
+                {"target_month": "2025-09", "picks": self.rows()}], "extra": self.value()}
+            ref = self.plain(obj)
+            for indent in (None, 2, 4):
+                self.assertEqual(dumps(obj, indent),
+                                 json.dumps(ref, ensure_ascii=False, indent=indent))
+
+    def test_plain_values(self):
+        for obj in ({}, [], {1: 2}, {"a": [1, {"b": None}], "e": {}}, "x", 3):
+            for indent in (None, 2):
+                self.assertEqual(dumps(obj, indent),
+                                 json.dumps(obj, ensure_ascii=False, indent=indent))
+
+    def test_placeholder_collision(self):
+        obj = {"note": "\x00rows0\x00", "picks": self.rows()}
+        self.assertEqual(dumps(obj, 2),
+                         json.dumps(self.plain(obj), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
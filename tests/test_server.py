@@ -0,0 +1,162 @@
+# tests/test_server.py —— fortune.server 对本地端口的端到端测试（serve(port=0)，只用标准库）
+# 运行：python -m pytest -q  或  python -m unittest discover tests
+import asyncio
+import json
+import pathlib
+import unittest
+
+from fortune.catalog import StyleCatalog
+from fortune.server import MAX_BATCH, MAX_BODY, serve
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+CATALOG = StyleCatalog.from_csv(ROOT / "data" / "styles.csv")
+
+
+async def read_response(reader):
+    """读一条响应：(状态码, 头部 dict, JSON 体)。"""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        k, _, v = line.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return status, headers, json.loads(body)
+
+
+def request(method, target, body=None, headers=()):
+    data = b"" if body is None else (body if isinstance(body, bytes) else json.dumps(body).encode())
+    head = [f"{method} {target} HTTP/1.1", "Host: test"]
+    head += [f"{k}: {v}" for k, v in headers]
+    if body is not None and not any(k.lower() == "content-length" for k, _ in headers):
+        head.append(f"Content-Length: {len(data)}")
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data
+
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = await serve(port=0, catalog=CATALOG)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def open(self):
+        return await asyncio.open_connection("127.0.0.1", self.port)
+
+    async def call(self, raw):
+        reader, writer = await self.open()
+        try:
+            writer.write(raw)
+            await writer.drain()
+            return await read_response(reader)
+        finally:
+            writer.close()
+
+    async def test_health(self):
+        status, _, body = await self.call(request("GET", "/health"))
+        self.assertEqual(status, 200)
+        self.assertEqual(body["styles"], len(CATALOG))
+        self.assertTrue(body["ok"])
+
+    async def test_get_reading(self):
+        status, _, body = await self.call(
+            request("GET", "/reading?target_month=2025-09&goal=wealth&nums=2,9,8&lang=en"))
+        self.assertEqual(status, 200)
+        self.assertEqual(body["month_element"], "metal")
+        self.assertEqual(body["meihua_element"], "earth")
+        self.assertEqual(len(body["picks"]), 3)
+
+    async def test_post_reading_with_constraints(self):
+        status, _, body = await self.call(request("POST", "/reading", {
+            "target_month": "2025-09", "goal": "love", "max_price": 15, "name": "Zoe"}))
+        self.assertEqual(status, 200)
+        self.assertEqual(body["name"], "Zoe")
+        self.assertTrue(all(float(p["price"]) <= 15 for p in body["picks"] if p["price"]))
+
+    async def test_readings_batch(self):
+        reqs = [{"target_month": "2025-09", "goal": "wealth"}, {"goal": "love"}, "oops"]
+        for payload in (reqs, {"requests": reqs}):
+            status, _, body = await self.call(request("POST", "/readings", payload))
+            self.assertEqual(status, 200)
+            results = body["results"]
+            self.assertEqual(len(results), 3)
+            self.assertIn("picks", results[0])
+            self.assertEqual(results[1], {"error": "target_month is required"})
+            self.assertIn("error", results[2])
+
+    async def test_batch_limit(self):
+        reqs = [{"target_month": "2025-09"}] * (MAX_BATCH + 1)
+        status, _, body = await self.call(request("POST", "/readings", reqs))
+        self.assertEqual(status, 400)
+
+    async def test_keep_alive_and_pipelining(self):
+        reader, writer = await self.open()
+        try:
+            writer.write(request("GET", "/health"))
+            status, headers, _ = await read_response(reader)
+            self.assertEqual((status, headers["connection"]), (200, "keep-alive"))
+            # 同一连接上两条流水线请求，按序应答
+            writer.write(request("GET", "/reading?target_month=2025-05")
+                         + request("GET", "/nope", headers=[("Connection", "close")]))
+            first = await read_response(reader)
+            second = await read_response(reader)
+            self.assertEqual(first[0], 200)
+            self.assertEqual(first[2]["month_element"], "fire")
+            self.assertEqual((second[0], second[1]["connection"]), (404, "close"))
+            self.assertEqual(await reader.read(), b"")      # 服务端已关闭连接
+        finally:
+            writer.close()
+
+    async def test_not_found(self):
+        status, _, body = await self.call(request("GET", "/missing"))
+        self.assertEqual(status, 404)
+
+    async def test_method_not_allowed(self):
+        self.assertEqual((await self.call(request("DELETE", "/reading")))[0], 405)
+        self.assertEqual((await self.call(request("GET", "/readings")))[0], 405)
+
+    async def test_bad_requests(self):
+        cases = [
+            request("POST", "/reading", b"{not json"),
+            request("POST", "/reading", {"goal": "wealth"}),
+            request("GET", "/reading?target_month=2025-09&min_price=cheap"),
+            request("POST", "/readings", {"requests": "nope"}),
+            b"GARBAGE\r\n\r\n",
+        ]
+        for raw in cases:
+            status, _, body = await self.call(raw)
+            self.assertEqual(status, 400, raw)
+            self.assertIn("error", body)
+
+    async def test_non_finite_prices(self):
+        for value in ("nan", "inf", "-inf", "1e400"):
+            status, _, body = await self.call(
+                request("GET", f"/reading?target_month=2025-09&max_price={value}"))
+            self.assertEqual(status, 400, value)
+        # JSON 里的 NaN / Infinity / 1e400 同样拒绝；批量里只让这一条变成 error
+        raw = b'[{"target_month": "2025-09", "min_price": NaN}, {"target_month": "2025-09", "max_price": 1e400},' \
+              b' {"target_month": "2025-09", "max_price": Infinity}, {"target_month": "2025-09", "max_price": 15}]'
+        status, _, body = await self.call(request("POST", "/readings", raw))
+        self.assertEqual(status, 200)
+        results = body["results"]
+        self.assertEqual([("error" in r) for r in results], [True, True, True, False])
+        self.assertEqual(len(results[3]["picks"]), 3)
+
+    async def test_bad_content_length(self):
+        for value in ("abc", "-1"):
+            status, headers, body = await self.call(
+                request("POST", "/reading", b"{}", headers=[("Content-Length", value)]))
+            self.assertEqual((status, headers["connection"]), (400, "close"), value)
+
+    async def test_body_too_large(self):
+        status, _, body = await self.call(
+            request("POST", "/readings", b"", headers=[("Content-Length", str(MAX_BODY + 1))]))
+        self.assertEqual(status, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
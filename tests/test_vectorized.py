@@ -0,0 +1,72 @@
+# tests/test_vectorized.py —— NumPy 批量打分与 rules.compute_score 逐条一致（没有 numpy 时跳过）
+import os
+import random
+import unittest
+
+from fortune.answers import DIGITS, MONTHS, answer_table
+from fortune.catalog import StyleCatalog
+from fortune.rules import GOAL_BIAS, compute_score
+
+try:
+    from fortune.vectorized import score_batch, score_catalog
+except ImportError:                         # pragma: no cover
+    score_batch = score_catalog = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ELEMENTS = ["wood", "fire", "earth", "metal", "water", "", "gold"]
+
+
+@unittest.skipIf(score_batch is None, "numpy not installed")
+class VectorizedTest(unittest.TestCase):
+    def setUp(self):
+        self.rnd = random.Random(9)
+        self.cat = StyleCatalog.from_csv(os.path.join(ROOT, "data", "styles.csv"))
+
+    def reference(self, month_elems, extra_elems, favoreds, picks):
+        return [compute_score(None, m, e, p, f)
+                for m, e, p, f in zip(month_elems, extra_elems, picks, favoreds)]
+
+    def test_answer_table_batch(self):
+        """答案表里共享的 picks 元组（按对象去重的路径）。"""
+        table, rnd = answer_table(self.cat), self.rnd
+        ans = [table.get(rnd.choice(MONTHS), rnd.choice(list(GOAL_BIAS)), rnd.choice(DIGITS))
+               for _ in range(5000)]
+        args = ([a.month_elem for a in ans], [a.extra_elem for a in ans],
+                [a.favored for a in ans], [a.picks for a in ans])
+        self.assertEqual(list(score_batch(*args, self.cat)), self.reference(*args))
+        self.assertEqual(list(score_batch(*args)), self.reference(*args))
+
+    def test_ragged_mixed_picks(self):
+        """长度不一的推荐、普通 dict、别的目录的行、目录里没有的元素。"""
+        rnd = self.rnd
+        other = StyleCatalog([{"sku": "X", "element": "gold"}, {"sku": "Y", "element": "fire"}])
+        rows = [self.cat[i] for i in range(len(self.cat))] + [other[0], other[1]]
+        for kind in ("rows", "dicts", "mixed"):
+            n = 3000
+            picks = []
+            for _ in range(n):
+                p = [rnd.choice(rows if kind != "rows" else rows[:-2]) for _ in range(rnd.randint(0, 4))]
+                if kind == "dicts":
+                    p = [dict(r) for r in p] + [{"element": None}] * rnd.randint(0, 1)
+                picks.append(p)
+            months = [rnd.choice(ELEMENTS) for _ in range(n)]
+            extras = [rnd.choice(ELEMENTS + [None]) for _ in range(n)]
+            favoreds = [rnd.sample(ELEMENTS, rnd.randint(0, 4)) for _ in range(n)]
+            self.assertEqual(list(score_batch(months, extras, favoreds, picks)),
+                             self.reference(months, extras, favoreds, picks), kind)
+
+    def test_empty(self):
+        self.assertEqual(list(score_batch([], [], [], [])), [])
+        self.assertEqual(list(score_batch(["fire"], [None], [["fire"]], [[]])),
+                         [compute_score(None, "fire", None, [], ["fire"])])
+
+    def test_score_catalog(self):
+        for month, extra, fav in (("metal", "earth", ["metal", "earth"]), ("fire", None, ["wood"]),
+                                  ("earth", "", [])):
+            self.assertEqual(list(score_catalog(self.cat, month, extra, fav)),
+                             [compute_score(None, month, extra, [self.cat[i]], fav)
+                              for i in range(len(self.cat))])
+
+
+if __name__ == "__main__":
+    unittest.main()